@@ -1,23 +1,1547 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import NamedTuple, Optional, Union
 
-startupinfo = subprocess.STARTUPINFO()
-startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-startupinfo.wShowWindow = subprocess.SW_HIDE
-creationflags = subprocess.CREATE_NO_WINDOW
-invisibledict = {
-    "startupinfo": startupinfo,
-    "creationflags": creationflags,
-    "start_new_session": True,
+if os.name == "nt":
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    creationflags = subprocess.CREATE_NO_WINDOW
+    invisibledict = {
+        "startupinfo": startupinfo,
+        "creationflags": creationflags,
+        "start_new_session": True,
+    }
+else:
+    invisibledict = {"start_new_session": True}
+
+
+_DEVICE_RE = re.compile(rb'\]\s*"([^"]+)"[^"]*\(([^)]+)\)')
+_ALTERNATIVE_NAME_RE = re.compile(rb'Alternative name\s+"([^"]+)"')
+_END_OF_INPUT_RE = re.compile(rb"Immediate exit requested|I/O error|Error opening input")
+_LEGACY_SECTION_RE = re.compile(rb"DirectShow (video|audio) devices")
+_LEGACY_DEVICE_RE = re.compile(rb'\]\s*"([^"]+)"\s*$')
+_AUDIO_OPTION_RE = re.compile(rb"ch=\s*(\d+),\s*bits=\s*(\d+),\s*rate=\s*(\d+)")
+_VIDEO_OPTION_RE = re.compile(
+    rb"\]\s*(\w+)=(\S+)\s+min s=(\d+)x(\d+)\s+fps=(\S+)\s+max s=(\d+)x(\d+)\s+fps=(\S+)\s*(\(.*\))?"
+)
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class AudioOption(NamedTuple):
+    r"""
+    One audio mode of a device, the compact form of {"ch": 2, "bits": 16, "rate": 44100}.
+    """
+
+    ch: int
+    bits: int
+    rate: int
+
+    def to_dict(self) -> dict:
+        return {"ch": self.ch, "bits": self.bits, "rate": self.rate}
+
+
+class VideoOption(NamedTuple):
+    r"""
+    One video mode of a device. Strings are interned, so the same pixel format,
+    codec or colour info of hundreds of modes is stored only once.
+    Exactly one of pixel_format (raw formats) and vcodec (compressed formats) is set.
+    fps is the maximum frame rate, like "fps" in the dict format.
+    """
+
+    pixel_format: Optional[str]
+    vcodec: Optional[str]
+    min_width: int
+    min_height: int
+    max_width: int
+    max_height: int
+    min_fps: Union[int, float]
+    fps: Union[int, float]
+    info: Optional[str]
+
+    def to_dict(self) -> dict:
+        option = (
+            {"pixel_format": self.pixel_format}
+            if self.pixel_format is not None
+            else {"vcodec": self.vcodec}
+        )
+        option["min_s"] = f"{self.min_width}x{self.min_height}"
+        option["fps"] = self.fps
+        option["max_s"] = f"{self.max_width}x{self.max_height}"
+        if self.info is not None:
+            option["info"] = self.info
+        return option
+
+    @classmethod
+    def from_dict(cls, option: dict) -> "VideoOption":
+        # the dict format only keeps the maximum frame rate, min_fps becomes fps
+        min_width, _, min_height = option["min_s"].partition("x")
+        max_width, _, max_height = option["max_s"].partition("x")
+        pixel_format, vcodec, info = (
+            option.get("pixel_format"),
+            option.get("vcodec"),
+            option.get("info"),
+        )
+        return cls(
+            pixel_format and sys.intern(pixel_format),
+            vcodec and sys.intern(vcodec),
+            int(min_width),
+            int(min_height),
+            int(max_width),
+            int(max_height),
+            option["fps"],
+            option["fps"],
+            info and sys.intern(info),
+        )
+
+
+class OptionTable(tuple):
+    r"""
+    The options of one device as a tuple of AudioOption or VideoOption records.
+    Returned by get_all_devices(..., compact=True), json.dumps writes every record as a short list.
+
+    Methods:
+        to_dict(): the classic {0: {...}, 1: {...}} options dict
+        columns(): {field: [values]}, one list per record field
+        to_numpy(): numpy structured array, e.g. table[(table["max_width"] >= 1280) & (table["fps"] >= 30)]
+    """
+
+    __slots__ = ()
+    record = None
+    dtypes = {}
+
+    def to_dict(self) -> dict:
+        return {ini: option.to_dict() for ini, option in enumerate(self)}
+
+    def columns(self) -> dict:
+        if not self:
+            return {field: [] for field in self.record._fields}
+        return {field: list(column) for field, column in zip(self.record._fields, zip(*self))}
+
+    def to_numpy(self):
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError("OptionTable.to_numpy needs numpy: pip install numpy") from e
+        columns = self.columns()
+        dtype = []
+        for field, column in columns.items():
+            fielddtype = self.dtypes[field]
+            if fielddtype == "U":
+                fielddtype = f"U{max((len(value or '') for value in column), default=1) or 1}"
+            dtype.append((field, fielddtype))
+        return np.array(
+            [tuple("" if value is None else value for value in option) for option in self],
+            dtype=dtype,
+        )
+
+
+class AudioOptionTable(OptionTable):
+    __slots__ = ()
+    record = AudioOption
+    dtypes = {"ch": "i4", "bits": "i4", "rate": "i4"}
+
+    @classmethod
+    def from_dict(cls, options: dict) -> "AudioOptionTable":
+        return cls(AudioOption(o["ch"], o["bits"], o["rate"]) for o in options.values())
+
+
+class VideoOptionTable(OptionTable):
+    __slots__ = ()
+    record = VideoOption
+    dtypes = {
+        "pixel_format": "U",
+        "vcodec": "U",
+        "min_width": "i4",
+        "min_height": "i4",
+        "max_width": "i4",
+        "max_height": "i4",
+        "min_fps": "f8",
+        "fps": "f8",
+        "info": "U",
+    }
+
+    @classmethod
+    def from_dict(cls, options: dict) -> "VideoOptionTable":
+        return cls(VideoOption.from_dict(o) for o in options.values())
+
+
+class _LineParser:
+    r"""
+    Line oriented state machine for the stderr of ffmpeg's dshow listings.
+    feed() takes one line and returns a parsed record or None.
+    Lines without a "[dshow @ ...]" prefix are skipped, they are the banner or noise like
+    "    Last message repeated 1 times" in the middle of a listing. done becomes True at the
+    line that ends the input ("<input>: Immediate exit requested", "I/O error",
+    "Error opening input"), nothing of interest follows, so the caller can stop reading.
+    """
+
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = False
+
+    def feed(self, line):
+        if not line.startswith(b"["):
+            if _END_OF_INPUT_RE.search(line):
+                self.done = True
+            return None
+        return self.parse(line)
+
+    def parse(self, line):
+        raise NotImplementedError
+
+
+class _DeviceListParser(_LineParser):
+    # -list_devices: records are (kind, name, alternative_name)
+    __slots__ = ("_pending",)
+
+    def __init__(self):
+        super().__init__()
+        self._pending = None
+
+    def parse(self, line):
+        m = _ALTERNATIVE_NAME_RE.search(line)
+        if m:
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                return pending + (m.group(1).decode("utf-8"),)
+            return None
+        m = _DEVICE_RE.search(line)
+        if m:
+            self._pending = (m.group(2).decode("utf-8"), m.group(1).decode("utf-8"))
+        return None
+
+
+class _LegacyDeviceListParser(_DeviceListParser):
+    # -list_devices of ffmpeg < 5: the names have no "(video)" / "(audio)",
+    # the kind comes from the "DirectShow video devices" / "DirectShow audio devices" headers
+    __slots__ = ("_kind",)
+
+    def __init__(self):
+        super().__init__()
+        self._kind = None
+
+    def parse(self, line):
+        m = _LEGACY_SECTION_RE.search(line)
+        if m:
+            self._kind = m.group(1).decode("utf-8")
+            return None
+        m = _LEGACY_DEVICE_RE.search(line)
+        if m:
+            if self._kind is not None:
+                self._pending = (self._kind, m.group(1).decode("utf-8"))
+            return None
+        return super().parse(line)
+
+
+class _AudioOptionsParser(_LineParser):
+    __slots__ = ()
+
+    def parse(self, line):
+        m = _AUDIO_OPTION_RE.search(line)
+        if m:
+            return AudioOption(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        return None
+
+
+class _VideoOptionsParser(_LineParser):
+    __slots__ = ()
+
+    def parse(self, line):
+        m = _VIDEO_OPTION_RE.search(line)
+        if not m:
+            return None
+        fmt, fmtvalue, min_w, min_h, min_fps, max_w, max_h, fps, info = m.groups()
+        fmtvalue = sys.intern(fmtvalue.decode("utf-8"))
+        return VideoOption(
+            fmtvalue if fmt != b"vcodec" else None,
+            fmtvalue if fmt == b"vcodec" else None,
+            int(min_w),
+            int(min_h),
+            int(max_w),
+            int(max_h),
+            _number(min_fps),
+            _number(fps),
+            sys.intern(info.decode("utf-8")) if info else None,
+        )
+
+
+class ProbeTrace(NamedTuple):
+    r"""
+    One ffmpeg call, recorded by EnumerationStats.
+    started is the time.time() of the spawn, latency the seconds from spawn to exit,
+    stderr_bytes what ffmpeg wrote to stderr (to stdout for "-version" and "-devices")
+    and parse_time the seconds spent in the parser.
+    """
+
+    argv: tuple
+    started: float
+    latency: float
+    stderr_bytes: int
+    parse_time: float
+
+
+class EnumerationStats:
+    r"""
+    Records a ProbeTrace for every ffmpeg call of get_all_devices / get_all_devices_async.
+    Without a stats object the probes are not instrumented at all.
+    Use one EnumerationStats per enumeration to get per-enumeration totals.
+
+    Args:
+        hook (callable, optional): Called with every ProbeTrace as soon as the ffmpeg call
+              has exited, in the thread (or task) of the probe. Forward the traces to a
+              tracing or metrics library here. Exceptions of the hook do not affect the
+              enumeration, they are collected in hook_errors as (trace, exception) pairs.
+
+    Example:
+        from ffmpegdevices import get_all_devices, EnumerationStats
+        stats = EnumerationStats(hook=print)
+        devices = get_all_devices(r"C:\ffmpeg\ffmpeg.exe", max_workers=4, stats=stats)
+        print(stats.totals())
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.traces = []
+        self.hook_errors = []
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        with self._lock:
+            self.traces.append(trace)
+        if self.hook is not None:
+            # instrumentation must not change the result, a broken hook only loses its traces
+            try:
+                self.hook(trace)
+            except Exception as e:
+                with self._lock:
+                    self.hook_errors.append((trace, e))
+
+    def totals(self):
+        r"""
+        calls, the summed latency, stderr_bytes and parse_time of all traces
+        and wall, the seconds from the first spawn to the last exit.
+        """
+        with self._lock:
+            traces = list(self.traces)
+        wall = 0.0
+        if traces:
+            wall = max(t.started + t.latency for t in traces) - min(t.started for t in traces)
+        return {
+            "calls": len(traces),
+            "latency": sum((t.latency for t in traces), 0.0),
+            "stderr_bytes": sum(t.stderr_bytes for t in traces),
+            "parse_time": sum((t.parse_time for t in traces), 0.0),
+            "wall": wall,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.traces = []
+            self.hook_errors = []
+
+
+class _RunningProcesses:
+    # the ffmpeg processes of one enumeration, kill_all() stops the ones still running
+    # in worker threads (where closing their generators is not possible) and every later one
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs = set()
+        self._killed = False
+
+    def add(self, proc):
+        with self._lock:
+            self._procs.add(proc)
+            if self._killed:
+                proc.kill()
+
+    def discard(self, proc):
+        with self._lock:
+            self._procs.discard(proc)
+
+    def kill_all(self):
+        with self._lock:
+            self._killed = True
+            for proc in self._procs:
+                if proc.poll() is None:
+                    proc.kill()
+
+
+def _iter_stderr_lines(cmd, timeout=None, trace=None, stdout=False, running=None):
+    # reads stderr (stdout if stdout is True) while ffmpeg is still running,
+    # closing the generator kills ffmpeg,
+    # after timeout seconds a timer kills it and TimeoutError is raised,
+    # a trace dict gets the spawn time, the latency and the stderr byte count,
+    # running (_RunningProcesses) lets another thread kill it
+    if trace is not None:
+        trace["started"] = time.time()
+        start = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE if stdout else subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if stdout else subprocess.PIPE,
+        **invisibledict,
+    )
+    if running is not None:
+        running.add(proc)
+    output = proc.stdout if stdout else proc.stderr
+    expired = threading.Event()
+    timer = None
+    if timeout is not None:
+
+        def expire():
+            expired.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, expire)
+        timer.daemon = True
+        timer.start()
+    try:
+        for line in output:
+            if trace is not None:
+                trace["stderr_bytes"] += len(line)
+            yield line.rstrip(b"\r\n")
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if proc.poll() is None:
+            proc.kill()
+        output.close()
+        proc.wait()
+        if running is not None:
+            running.discard(proc)
+        if trace is not None:
+            trace["latency"] = time.perf_counter() - start
+    if expired.is_set():
+        raise TimeoutError(f"{cmd[0]} was killed after {timeout:.3g} s")
+
+
+def _add_trace(stats, cmd, trace, parse_time):
+    # nothing is recorded if ffmpeg could not be started
+    if "latency" in trace:
+        stats.add(
+            ProbeTrace(
+                tuple(cmd),
+                trace["started"],
+                trace["latency"],
+                trace["stderr_bytes"],
+                parse_time,
+            )
+        )
+
+
+def _iter_records(cmd, parser, timeout=None, stats=None, stdout=False, running=None):
+    if stats is not None:
+        yield from _iter_traced_records(cmd, parser, timeout, stats, stdout, running)
+        return
+    lines = _iter_stderr_lines(cmd, timeout, stdout=stdout, running=running)
+    try:
+        for line in lines:
+            record = parser.feed(line)
+            if record is not None:
+                yield record
+            if parser.done:
+                break
+    finally:
+        lines.close()
+
+
+def _iter_traced_records(cmd, parser, timeout, stats, stdout=False, running=None):
+    # _iter_records with timing, kept apart so that the uninstrumented loop stays as it is
+    trace = {"stderr_bytes": 0}
+    parse_time = 0.0
+    lines = _iter_stderr_lines(cmd, timeout, trace, stdout, running)
+    try:
+        for line in lines:
+            start = time.perf_counter()
+            record = parser.feed(line)
+            parse_time += time.perf_counter() - start
+            if record is not None:
+                yield record
+            if parser.done:
+                break
+    finally:
+        lines.close()
+        _add_trace(stats, cmd, trace, parse_time)
+
+
+async def _arun_records(cmd, parser, stats=None, stdout=False):
+    # asyncio counterpart of _iter_records, shares the same parsers
+    if stats is not None:
+        trace = {"started": time.time(), "stderr_bytes": 0}
+        parse_time = 0.0
+        start = time.perf_counter()
+    spawn = asyncio.ensure_future(
+        asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE if stdout else subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL if stdout else subprocess.PIPE,
+            **invisibledict,
+        )
+    )
+    try:
+        proc = await asyncio.shield(spawn)
+    except asyncio.CancelledError:
+        # a cancelled spawn still starts ffmpeg, kill it instead of leaving it behind
+        proc = await spawn
+        proc.kill()
+        await proc.wait()
+        raise
+    output = proc.stdout if stdout else proc.stderr
+    records = []
+    try:
+        while True:
+            line = await output.readline()
+            if not line:
+                break
+            if stats is None:
+                record = parser.feed(line.rstrip(b"\r\n"))
+            else:
+                trace["stderr_bytes"] += len(line)
+                parse_start = time.perf_counter()
+                record = parser.feed(line.rstrip(b"\r\n"))
+                parse_time += time.perf_counter() - parse_start
+            if record is not None:
+                records.append(record)
+            if parser.done:
+                break
+    finally:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        exited = asyncio.ensure_future(proc.wait())
+        try:
+            await asyncio.shield(exited)
+        except asyncio.CancelledError:
+            # cancelled while ffmpeg exits, reap it anyway
+            await exited
+            raise
+        finally:
+            if stats is not None:
+                trace["latency"] = time.perf_counter() - start
+                _add_trace(stats, cmd, trace, parse_time)
+    return records
+
+
+class _FfmpegProbe(NamedTuple):
+    cmd: list
+    parser: _LineParser
+    stdout: bool = False  # "-version" and "-devices" write to stdout
+
+
+def _run_probe(probe, timeout=None, stats=None, running=None):
+    if isinstance(probe, _FfmpegProbe):
+        return _iter_records(probe.cmd, probe.parser, timeout, stats, probe.stdout, running)
+    return probe
+
+
+async def _arun_probe(probe, timeout=None, stats=None):
+    if isinstance(probe, _FfmpegProbe):
+        try:
+            return await asyncio.wait_for(
+                _arun_records(probe.cmd, probe.parser, stats, probe.stdout), timeout
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{probe.cmd[0]} was killed after {timeout:.3g} s") from None
+    return probe
+
+
+class DshowBackend:
+    r"""
+    DirectShow (Windows): "-list_devices" and "-list_options" of "ffmpeg -f dshow".
+
+    A backend has two methods, each returns either an ffmpeg call to run and parse
+    (both sync and async) or the records directly:
+        devices_probe(ffmpegexe): records are (kind, name, alternative_name)
+        options_probe(ffmpegexe, kind, alternative_name): records are AudioOption / VideoOption
+    and optionally
+        configure(capabilities): gets the FfmpegCapabilities of the ffmpeg build and returns
+              the backend to use with it, raises ValueError if the build cannot serve it
+
+    Args:
+        legacy (bool): Parse the "-list_devices" layout of ffmpeg < 5.
+              configure() sets it from the ffmpeg version.
+    """
+
+    name = "dshow"
+    input_device = "dshow"
+
+    def __init__(self, legacy: bool = False):
+        self.legacy = legacy
+
+    def configure(self, capabilities):
+        _require_input_device(capabilities, self.input_device)
+        version = capabilities.version_info
+        return DshowBackend(legacy=bool(version) and version < (5,))
+
+    def devices_probe(self, ffmpegexe):
+        return _FfmpegProbe(
+            [ffmpegexe, "-list_devices", "true", "-f", "dshow", "-i", "dummy"],
+            _LegacyDeviceListParser() if self.legacy else _DeviceListParser(),
+        )
+
+    def options_probe(self, ffmpegexe, kind, alt_dev):
+        if kind == "audio":
+            parser = _AudioOptionsParser()
+        else:
+            kind, parser = "video", _VideoOptionsParser()
+        return _FfmpegProbe(
+            [ffmpegexe, "-list_options", "true", "-f", "dshow", "-i", f"{kind}={alt_dev}"],
+            parser,
+        )
+
+
+_V4L2_FORMAT_RE = re.compile(rb"\]\s*(Raw|Compressed)\s*:\s*(\S+)\s*:")
+_SIZE_RE = re.compile(rb"(\d+)x(\d+)")
+
+
+class _V4l2FormatsParser(_LineParser):
+    # "-f v4l2 -list_formats all", one line per format with all frame sizes:
+    # [video4linux2,v4l2 @ 0x...] Raw       :     yuyv422 :           YUYV 4:2:2 : 640x480 1280x720
+    __slots__ = ()
+
+    def parse(self, line):
+        m = _V4L2_FORMAT_RE.search(line)
+        if not m:
+            return None
+        fmt = sys.intern(m.group(2).decode("utf-8"))
+        sizes = line.rsplit(b" : ", 1)[-1]
+        return [
+            VideoOption(
+                fmt if m.group(1) == b"Raw" else None,
+                fmt if m.group(1) == b"Compressed" else None,
+                int(w),
+                int(h),
+                int(w),
+                int(h),
+                0,
+                0,
+                None,
+            )
+            for w, h in _SIZE_RE.findall(sizes)
+        ]
+
+
+def _read_text(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+class V4l2Backend:
+    r"""
+    Video4Linux2 (Linux) cameras. The devices are read from sysfs_root/class/video4linux,
+    no process is started. Only the primary node of a device is listed (sysfs "index" 0),
+    the metadata nodes of UVC cameras are skipped.
+    The kernel does not expose the formats in sysfs, so the options come from
+    "ffmpeg -f v4l2 -list_formats all -i /dev/videoN", one option per frame size.
+    v4l2 does not list frame rates there, "fps" is 0 (unknown): ModeResolver accepts such a
+    mode for any min_fps and asks ffmpeg for the requested frame rate.
+
+    Args:
+        sysfs_root (str): Root of sysfs (default "/sys"), point it to a copy for tests.
+        dev_root (str): Folder of the device nodes (default "/dev").
+    """
+
+    name = "v4l2"
+    input_device = "v4l2"
+
+    def __init__(self, sysfs_root: str = "/sys", dev_root: str = "/dev"):
+        self.sysfs_root = sysfs_root
+        self.dev_root = dev_root
+
+    def configure(self, capabilities):
+        _require_input_device(capabilities, self.input_device)
+        return self
+
+    def devices_probe(self, ffmpegexe):
+        folder = os.path.join(self.sysfs_root, "class", "video4linux")
+        try:
+            entries = os.listdir(folder)
+        except OSError:
+            return []
+        records = []
+        for entry in sorted(
+            (e for e in entries if re.fullmatch(r"video\d+", e)), key=lambda e: int(e[5:])
+        ):
+            try:
+                if _read_text(os.path.join(folder, entry, "index")).strip() != "0":
+                    continue
+            except OSError:
+                pass
+            try:
+                name = _read_text(os.path.join(folder, entry, "name")).strip()
+            except OSError:
+                name = entry
+            records.append(("video", name or entry, os.path.join(self.dev_root, entry)))
+        return records
+
+    def options_probe(self, ffmpegexe, kind, alt_dev):
+        return _FfmpegProbe(
+            [ffmpegexe, "-f", "v4l2", "-list_formats", "all", "-i", alt_dev],
+            _V4l2FormatsParser(),
+        )
+
+
+_ALSA_CARD_RE = re.compile(r"^\s*(\d+)\s+\[[^\]]*\]:\s*.*?\s+-\s+(.*?)\s*$")
+_ALSA_PCM_RE = re.compile(r"^(\d+)-(\d+):\s*([^:]*?)\s*:.*\bcapture\s+\d+")
+
+
+class AlsaBackend:
+    r"""
+    ALSA (Linux) capture devices, read from procfs_root/asound without starting a process.
+    The devices come from /proc/asound/pcm (all PCMs with a capture stream),
+    the alternative_name is the ffmpeg input "hw:card,device".
+    USB audio devices describe their formats in /proc/asound/cardN/streamM, these become
+    the options, the options of other cards are empty.
+
+    Args:
+        procfs_root (str): Root of procfs (default "/proc"), point it to a copy for tests.
+    """
+
+    name = "alsa"
+    input_device = "alsa"
+
+    def __init__(self, procfs_root: str = "/proc"):
+        self.procfs_root = procfs_root
+
+    def configure(self, capabilities):
+        _require_input_device(capabilities, self.input_device)
+        return self
+
+    def devices_probe(self, ffmpegexe):
+        asound = os.path.join(self.procfs_root, "asound")
+        cards = {}
+        try:
+            for line in _read_text(os.path.join(asound, "cards")).splitlines():
+                m = _ALSA_CARD_RE.match(line)
+                if m:
+                    cards[int(m.group(1))] = m.group(2)
+            pcms = _read_text(os.path.join(asound, "pcm")).splitlines()
+        except OSError:
+            return []
+        records = []
+        for line in pcms:
+            m = _ALSA_PCM_RE.match(line)
+            if m:
+                card, device = int(m.group(1)), int(m.group(2))
+                name = m.group(3)
+                if card in cards:
+                    name = f"{cards[card]}: {name}"
+                records.append(("audio", name, f"hw:{card},{device}"))
+        return records
+
+    def options_probe(self, ffmpegexe, kind, alt_dev):
+        card, _, device = alt_dev[3:].partition(",")
+        path = os.path.join(self.procfs_root, "asound", f"card{card}", f"stream{device}")
+        try:
+            text = _read_text(path)
+        except OSError:
+            return []
+        options = []
+        capture, bits, channels = False, None, None
+        for line in text.splitlines():
+            stripped = line.strip()
+            if line and not line[0].isspace():
+                capture = stripped.startswith("Capture")
+            elif not capture:
+                continue
+            elif stripped.startswith("Format:"):
+                m = re.search(r"\d+", stripped[7:])
+                bits = int(m.group()) if m else None
+            elif stripped.startswith("Channels:"):
+                channels = int(stripped[9:].strip())
+            elif stripped.startswith("Rates:") and bits and channels:
+                for rate in re.findall(r"\d+", stripped[6:]):
+                    options.append(AudioOption(channels, bits, int(rate)))
+        return options
+
+
+class LinuxBackend:
+    r"""
+    v4l2 cameras (V4l2Backend) and ALSA capture devices (AlsaBackend) together.
+    configure() drops the part whose input device the ffmpeg build lacks.
+
+    Args:
+        sysfs_root (str): See V4l2Backend.
+        procfs_root (str): See AlsaBackend.
+        dev_root (str): See V4l2Backend.
+    """
+
+    name = "linux"
+
+    def __init__(
+        self, sysfs_root: str = "/sys", procfs_root: str = "/proc", dev_root: str = "/dev"
+    ):
+        self.v4l2 = V4l2Backend(sysfs_root, dev_root)
+        self.alsa = AlsaBackend(procfs_root)
+
+    def configure(self, capabilities):
+        configured = copy.copy(self)
+        for part in ("v4l2", "alsa"):
+            if getattr(self, part).input_device not in capabilities.input_devices:
+                setattr(configured, part, None)
+        if configured.v4l2 is None and configured.alsa is None:
+            _require_input_device(capabilities, "v4l2 or alsa")
+        return configured
+
+    def devices_probe(self, ffmpegexe):
+        records = []
+        for backend in (self.v4l2, self.alsa):
+            if backend is not None:
+                records.extend(backend.devices_probe(ffmpegexe))
+        return records
+
+    def options_probe(self, ffmpegexe, kind, alt_dev):
+        backend = self.alsa if kind == "audio" else self.v4l2
+        return backend.options_probe(ffmpegexe, kind, alt_dev)
+
+
+BACKENDS = {
+    "dshow": DshowBackend,
+    "v4l2": V4l2Backend,
+    "alsa": AlsaBackend,
+    "linux": LinuxBackend,
 }
 
 
-def get_all_devices(ffmpegexe: str) -> dict:
+def _get_backend(backend):
+    if backend is None:
+        backend = "dshow" if os.name == "nt" else "linux"
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}, use one of {sorted(BACKENDS)}")
+        return BACKENDS[backend]()
+    return backend
+
+
+class FfmpegCapabilities(NamedTuple):
+    r"""
+    What an ffmpeg build supports, see get_capabilities.
+    version is the version string ("6.0-full_build-www.gyan.dev"), version_info its numbers
+    ((6, 0)) or () for builds from git, configuration the flags of ./configure and
+    input_devices the names of the input devices ("dshow", "v4l2", "alsa", ...).
+    """
+
+    path: str
+    version: str
+    version_info: tuple
+    configuration: tuple
+    input_devices: frozenset
+
+
+_VERSION_RE = re.compile(r"^ffmpeg version (\S+)", re.M)
+_VERSION_INFO_RE = re.compile(r"n?(\d+)\.(\d+)(?:\.(\d+))?")
+_CONFIGURATION_RE = re.compile(r"^configuration:(.*)$", re.M)
+_DEVICES_RE = re.compile(r"^ ([D ])[E ] (\S+)", re.M)
+_CAPABILITIES = {}
+_CAPABILITIES_LOCK = threading.Lock()
+
+
+def _resolve_exe(ffmpegexe):
+    return os.path.abspath(shutil.which(ffmpegexe) or ffmpegexe)
+
+
+class _RawLinesParser(_LineParser):
+    # every line as it is, for the stdout of "-version" and "-devices"
+    __slots__ = ()
+
+    def feed(self, line):
+        return line
+
+
+def _info_text(probe, timeout, stats):
+    return b"\n".join(_run_probe(probe, timeout, stats)).decode("utf-8", "replace")
+
+
+async def _ainfo_text(probe, timeout, stats):
+    return b"\n".join(await _arun_probe(probe, timeout, stats)).decode("utf-8", "replace")
+
+
+def _info_probe(exe, option):
+    return _FfmpegProbe([exe, "-hide_banner", option], _RawLinesParser(), True)
+
+
+def _capabilities_path(cache_dir, ffmpegexe):
+    return os.path.join(
+        cache_dir, f"{_CACHE_PREFIX}{_exe_fingerprint(ffmpegexe)}-capabilities.json"
+    )
+
+
+def _known_capabilities(ffmpegexe, cache_dir):
+    # the memo key and the memoized capabilities, from cache_dir after a restart, or None
+    exe = _resolve_exe(ffmpegexe)
+    try:
+        st = os.stat(exe)
+    except OSError:
+        raise FileNotFoundError(f"ffmpeg executable not found: {ffmpegexe}") from None
+    key = (exe, st.st_size, st.st_mtime_ns)
+    with _CAPABILITIES_LOCK:
+        capabilities = _CAPABILITIES.get(key)
+    if capabilities is None and cache_dir is not None:
+        try:
+            with open(_capabilities_path(cache_dir, ffmpegexe), "r", encoding="utf-8") as f:
+                c = json.load(f)["capabilities"]
+            capabilities = FfmpegCapabilities(
+                c["path"],
+                c["version"],
+                tuple(c["version_info"]),
+                tuple(c["configuration"]),
+                frozenset(c["input_devices"]),
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return key, None
+        with _CAPABILITIES_LOCK:
+            _CAPABILITIES[key] = capabilities
+    return key, capabilities
+
+
+def _check_version(ffmpegexe, version):
+    if not _VERSION_RE.search(version):
+        raise ValueError(f"{ffmpegexe} does not look like ffmpeg, -version printed no version")
+
+
+def _new_capabilities(key, version, devices, cache_dir, ffmpegexe):
+    m = _VERSION_RE.search(version)
+    numbers = _VERSION_INFO_RE.match(m.group(1))
+    configuration = _CONFIGURATION_RE.search(version)
+    capabilities = FfmpegCapabilities(
+        key[0],
+        m.group(1),
+        tuple(int(n) for n in numbers.groups() if n is not None) if numbers else (),
+        tuple(configuration.group(1).split()) if configuration else (),
+        frozenset(
+            name
+            for demux, names in _DEVICES_RE.findall(devices)
+            if demux == "D"
+            for name in names.split(",")
+        ),
+    )
+    with _CAPABILITIES_LOCK:
+        _CAPABILITIES[key] = capabilities
+    if cache_dir is not None:
+        c = capabilities._asdict()
+        c["input_devices"] = sorted(capabilities.input_devices)
+        _write_json(
+            _capabilities_path(cache_dir, ffmpegexe), {"created": time.time(), "capabilities": c}
+        )
+    return capabilities
+
+
+def get_capabilities(
+    ffmpegexe: str,
+    timeout: Optional[float] = None,
+    cache_dir: Optional[str] = None,
+    stats: Optional[EnumerationStats] = None,
+) -> FfmpegCapabilities:
+    r"""
+    Runs "ffmpeg -hide_banner -version" and "ffmpeg -hide_banner -devices" once per executable.
+    The result is memoized by path, size and mtime, replacing the executable invalidates it.
+    get_all_devices uses it to skip backends the build lacks, to fail fast and to pick the parser
+    for the output of older ffmpeg versions.
+
+    Args:
+        ffmpegexe (str): The path to the FFmpeg executable.
+        timeout (float, optional): Seconds each of the two calls may take.
+        cache_dir (str, optional): Also keeps the result in this folder (see get_all_devices),
+              so a new process does not run the two calls again.
+        stats (EnumerationStats, optional): Records the two calls.
+
+    Raises:
+        FileNotFoundError: ffmpegexe does not exist, nothing is started.
+        ValueError: ffmpegexe is not ffmpeg, "-version" printed no version.
+
+    Example:
+        from ffmpegdevices import get_capabilities
+        capabilities = get_capabilities(r"C:\ffmpeg\ffmpeg.exe")
+        capabilities.version_info, "dshow" in capabilities.input_devices
+    """
+    key, capabilities = _known_capabilities(ffmpegexe, cache_dir)
+    if capabilities is not None:
+        return capabilities
+    version = _info_text(_info_probe(key[0], "-version"), timeout, stats)
+    _check_version(ffmpegexe, version)
+    devices = _info_text(_info_probe(key[0], "-devices"), timeout, stats)
+    return _new_capabilities(key, version, devices, cache_dir, ffmpegexe)
+
+
+async def _aget_capabilities(ffmpegexe, timeout=None, cache_dir=None, stats=None):
+    # asyncio counterpart of get_capabilities, a cancel kills the running call
+    key, capabilities = await asyncio.to_thread(_known_capabilities, ffmpegexe, cache_dir)
+    if capabilities is not None:
+        return capabilities
+    version = await _ainfo_text(_info_probe(key[0], "-version"), timeout, stats)
+    _check_version(ffmpegexe, version)
+    devices = await _ainfo_text(_info_probe(key[0], "-devices"), timeout, stats)
+    return await asyncio.to_thread(
+        _new_capabilities, key, version, devices, cache_dir, ffmpegexe
+    )
+
+
+def _require_input_device(capabilities, name):
+    if name not in capabilities.input_devices:
+        raise ValueError(
+            f"{capabilities.path} (ffmpeg {capabilities.version}) has no {name} input device, "
+            f"it has {', '.join(sorted(capabilities.input_devices)) or 'none'}"
+        )
+
+
+def _resolve_backend(backend, ffmpegexe, timeout=None, cache_dir=None, stats=None):
+    # adapts the backend to the ffmpeg build, backends without configure() are used as they are
+    backend = _get_backend(backend)
+    configure = getattr(backend, "configure", None)
+    if configure is None:
+        return backend
+    return configure(get_capabilities(ffmpegexe, timeout, cache_dir, stats))
+
+
+async def _aresolve_backend(backend, ffmpegexe, timeout=None, cache_dir=None, stats=None):
+    backend = _get_backend(backend)
+    configure = getattr(backend, "configure", None)
+    if configure is None:
+        return backend
+    return configure(await _aget_capabilities(ffmpegexe, timeout, cache_dir, stats))
+
+
+def _option_table(kind):
+    return AudioOptionTable if kind == "audio" else VideoOptionTable
+
+
+def _flatten_records(records):
+    # the v4l2 parser yields one list of options per format line
+    flat = []
+    for record in records:
+        if isinstance(record, list):
+            flat.extend(record)
+        else:
+            flat.append(record)
+    return flat
+
+
+class ProbeResult(NamedTuple):
+    r"""
+    Outcome of the "-list_options" probe of one device.
+    status is "ok", "timed_out" (killed by the timeout or the deadline) or "failed",
+    error is the reason if it is not "ok", elapsed is in seconds.
+    """
+
+    options: Union[dict, OptionTable]
+    status: str
+    elapsed: float
+    error: Optional[str] = None
+
+
+def _probe_timeout(timeout, deadline_at):
+    if deadline_at is None:
+        return timeout
+    remaining = deadline_at - time.perf_counter()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _probe_result(kind, compact, records, start, error=None, status="ok"):
+    table = _option_table(kind)(records)
+    return ProbeResult(
+        table if compact else table.to_dict(), status, time.perf_counter() - start, error
+    )
+
+
+def _get_options(
+    backend,
+    ffmpegexe,
+    kind,
+    alt_dev,
+    compact=False,
+    timeout=None,
+    deadline_at=None,
+    stats=None,
+    running=None,
+):
+    start = time.perf_counter()
+    timeout = _probe_timeout(timeout, deadline_at)
+    if timeout is not None and timeout <= 0:
+        return _probe_result(kind, compact, (), start, "deadline exceeded", "timed_out")
+    try:
+        records = _flatten_records(
+            _run_probe(
+                backend.options_probe(ffmpegexe, kind, alt_dev), timeout, stats, running
+            )
+        )
+    except TimeoutError as e:
+        return _probe_result(kind, compact, (), start, str(e), "timed_out")
+    except Exception as e:
+        return _probe_result(kind, compact, (), start, str(e), "failed")
+    return _probe_result(kind, compact, records, start)
+
+
+async def _aget_options(
+    backend,
+    ffmpegexe,
+    kind,
+    alt_dev,
+    compact=False,
+    timeout=None,
+    deadline_at=None,
+    stats=None,
+):
+    start = time.perf_counter()
+    timeout = _probe_timeout(timeout, deadline_at)
+    if timeout is not None and timeout <= 0:
+        return _probe_result(kind, compact, (), start, "deadline exceeded", "timed_out")
+    try:
+        records = _flatten_records(
+            await _arun_probe(
+                backend.options_probe(ffmpegexe, kind, alt_dev), timeout, stats
+            )
+        )
+    except TimeoutError as e:
+        return _probe_result(kind, compact, (), start, str(e), "timed_out")
+    except Exception as e:
+        return _probe_result(kind, compact, (), start, str(e), "failed")
+    return _probe_result(kind, compact, records, start)
+
+
+def _map_options(alld, function):
+    return {
+        key: {
+            ini: dict(device, options=function(key, device["options"]))
+            for ini, device in devices.items()
+        }
+        for key, devices in alld.items()
+    }
+
+
+def _dict_options(key, options):
+    return options.to_dict() if isinstance(options, OptionTable) else options
+
+
+def _compact_options(key, options):
+    return _option_table(key).from_dict(options)
+
+
+def _group_devices(records):
+    alldevices = {}
+    for kind, name, alt_dev in records:
+        if kind not in alldevices:
+            alldevices[kind] = {}
+        alldevices[kind][name] = alt_dev
+    return alldevices
+
+
+def _list_devices(backend, ffmpegexe, timeout=None, stats=None):
+    return _group_devices(_run_probe(backend.devices_probe(ffmpegexe), timeout, stats))
+
+
+def _device_jobs(alldevices):
+    return [
+        (key, ini, key2, item2)
+        for key, items in alldevices.items()
+        for ini, (key2, item2) in enumerate(items.items())
+    ]
+
+
+def _device_record(name, alt_dev, result):
+    device = {
+        "name": name,
+        "alternative_name": alt_dev,
+        "options": result.options,
+        "status": result.status,
+        "elapsed": round(result.elapsed, 6),
+    }
+    if result.error is not None:
+        device["error"] = result.error
+    return device
+
+
+def _assemble_devices(alldevices, jobs, results):
+    alld = {key: {} for key in alldevices}
+    for (key, ini, key2, item2), result in zip(jobs, results):
+        alld[key][ini] = _device_record(key2, item2, result)
+    return alld
+
+
+def _lazy_device(backend, ffmpegexe, key, name, alt_dev, timeout, stats):
+    return LazyDevice(
+        name,
+        alt_dev,
+        partial(_get_options, backend, ffmpegexe, key, alt_dev, False, timeout, None, stats),
+    )
+
+
+def _restore_int_keys(obj):
+    # JSON turns the device and option indices into strings
+    if isinstance(obj, dict):
+        return {
+            int(k) if isinstance(k, str) and k.isdigit() else k: _restore_int_keys(v)
+            for k, v in obj.items()
+        }
+    return obj
+
+
+def _exe_fingerprint(ffmpegexe):
+    exe = _resolve_exe(ffmpegexe)
+    try:
+        st = os.stat(exe)
+        size, mtime = st.st_size, st.st_mtime_ns
+    except OSError:
+        size, mtime = 0, 0
+    return hashlib.sha1(f"{exe}|{size}|{mtime}".encode("utf-8")).hexdigest()[:16]
+
+
+# cache entries are "ffmpegdevices-<executable fingerprint>-<device list fingerprint>.json"
+# and "ffmpegdevices-<executable fingerprint>-capabilities.json" (get_capabilities)
+_CACHE_PREFIX = "ffmpegdevices-"
+_CACHE_ENTRY_RE = re.compile(r"ffmpegdevices-([0-9a-f]{16})-([0-9a-f]{16}|capabilities)\.json")
+
+
+def _cache_path(cache_dir, ffmpegexe, alldevices):
+    devicesfingerprint = hashlib.sha1(
+        json.dumps(alldevices, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(
+        cache_dir, f"{_CACHE_PREFIX}{_exe_fingerprint(ffmpegexe)}-{devicesfingerprint}.json"
+    )
+
+
+def _cache_entries(cache_dir, exefingerprint=None):
+    try:
+        files = os.listdir(cache_dir)
+    except OSError:
+        return []
+    entries = []
+    for file in files:
+        m = _CACHE_ENTRY_RE.fullmatch(file)
+        if m and (exefingerprint is None or m.group(1) == exefingerprint):
+            entries.append(file)
+    return entries
+
+
+def _read_cache(path, cache_ttl):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if cache_ttl is not None and time.time() - entry["created"] > cache_ttl:
+            return None
+        return _restore_int_keys(entry["devices"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_json(path, data):
+    # write to a temporary file and swap it in, readers never see a partial file
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmppath = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=_CACHE_PREFIX, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmppath, path)
+        except BaseException:
+            try:
+                os.remove(tmppath)
+            except OSError:
+                pass
+            raise
+    except OSError:
+        return False
+    return True
+
+
+def _write_cache(path, alld):
+    if not _write_json(path, {"created": time.time(), "devices": alld}):
+        return
+    # the new entry replaces the entries of older device lists of the same executable
+    folder, file = os.path.split(path)
+    for old in _cache_entries(folder, _CACHE_ENTRY_RE.fullmatch(file).group(1)):
+        if old != file and not old.endswith("-capabilities.json"):
+            try:
+                os.remove(os.path.join(folder, old))
+            except OSError:
+                pass
+
+
+def clear_device_cache(cache_dir: str, ffmpegexe: Optional[str] = None) -> int:
+    r"""
+    Deletes cached device inventories and ffmpeg capabilities created by
+    get_all_devices(..., cache_dir=...). Other files in cache_dir are left alone.
+
+    Args:
+        cache_dir (str): The cache folder that was passed to get_all_devices.
+        ffmpegexe (str, optional): Only delete the entries of this FFmpeg executable.
+              If None (default), all entries are deleted.
+
+    Returns:
+        int: The number of deleted entries.
+    """
+    deleted = 0
+    for file in _cache_entries(cache_dir, _exe_fingerprint(ffmpegexe) if ffmpegexe else None):
+        try:
+            os.remove(os.path.join(cache_dir, file))
+            deleted += 1
+        except OSError:
+            pass
+    return deleted
+
+
+class LazyOptions(MutableMapping):
+    r"""
+    The options of one device, the "-list_options" probe runs on first access and the result
+    is memoized. Returned by get_all_devices(..., lazy=True), it is a mapping like the normal
+    options dict (indexing, iteration, len, ==, mutation, dict(options) for a plain copy).
+    json.dumps of a device or of the whole inventory writes the options like a dict,
+    json.dumps of the options alone needs default=json_default.
+    """
+
+    __slots__ = ("_loader", "_lock", "_options")
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._options = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is None
+
+    def load(self) -> dict:
+        if self._loader is not None:
+            with self._lock:
+                if self._loader is not None:
+                    options = self._loader()
+                    self._options = options if type(options) is dict else dict(options)
+                    self._loader = None
+        return self._options
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __setitem__(self, key, value):
+        self.load()[key] = value
+
+    def __delitem__(self, key):
+        del self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __repr__(self):
+        return repr(self.load())
+
+    def __reduce__(self):
+        return dict, (dict(self.load()),)
+
+
+class LazyDevice(dict):
+    r"""
+    One device of get_all_devices(..., lazy=True), a dict that holds "name" and
+    "alternative_name" from "-list_devices". Until the probe ran device["options"] is a
+    LazyOptions, afterwards the plain options dict it loaded. Every other key ("status",
+    "elapsed", "error"), iteration, len, ==, items(), mutation and pickling run the
+    "-list_options" probe first and then see the same record as an eager call, so pprint,
+    json.dumps and dict(device) work as with a plain dict.
+    repr() shows only what is loaded, it does not start a probe.
+    """
+
+    __slots__ = ("_options",)
+
+    _LISTED = frozenset(("name", "alternative_name", "options"))
+
+    def __init__(self, name, alt_dev, probe):
+        # probe() returns the ProbeResult of the device
+        super().__init__(name=name, alternative_name=alt_dev)
+        self._options = LazyOptions(partial(self._load, probe))
+
+    def _load(self, probe):
+        # runs under the lock of the LazyOptions, exactly once
+        result = probe()
+        name, alt_dev = dict.__getitem__(self, "name"), dict.__getitem__(self, "alternative_name")
+        dict.update(self, _device_record(name, alt_dev, result))
+        return result.options
+
+    @property
+    def loaded(self) -> bool:
+        return self._options.loaded
+
+    def load(self) -> "LazyDevice":
+        self._options.load()
+        return self
+
+    def __getitem__(self, key):
+        if key == "options" and not self._options.loaded:
+            return self._options
+        if key not in self._LISTED:
+            self.load()
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key not in self._LISTED:
+            self.load()
+        return dict.__contains__(self, key)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self.load(), key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self.load(), key)
+
+    def __iter__(self):
+        return dict.__iter__(self.load())
+
+    def __len__(self):
+        return dict.__len__(self.load())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyDevice):
+            other.load()
+        return dict.__eq__(self.load(), other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def keys(self):
+        return dict.keys(self.load())
+
+    def values(self):
+        return dict.values(self.load())
+
+    def items(self):
+        return dict.items(self.load())
+
+    def copy(self) -> dict:
+        return dict.copy(self.load())
+
+    def update(self, *args, **kwargs):
+        dict.update(self.load(), *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        return dict.setdefault(self.load(), key, default)
+
+    def pop(self, *args):
+        return dict.pop(self.load(), *args)
+
+    def popitem(self):
+        return dict.popitem(self.load())
+
+    def clear(self):
+        dict.clear(self.load())
+
+    def __or__(self, other):
+        return dict.__or__(self.copy(), other)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+
+def json_default(obj):
+    r"""
+    default= hook for json.dump / json.dumps, writes LazyOptions (loading them) like a dict.
+    Only needed for the options on their own, lazy devices are dicts.
+
+    Example:
+        devices = get_all_devices(ffmpegexe, lazy=True)
+        json.dumps(devices["video"][0]["options"], default=json_default)
+    """
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def get_all_devices(
+    ffmpegexe: str,
+    max_workers: int = 1,
+    cache_dir: Optional[str] = None,
+    cache_ttl: Optional[float] = None,
+    lazy: bool = False,
+    compact: bool = False,
+    backend: Union[str, object, None] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[EnumerationStats] = None,
+) -> dict:
     r"""
         Retrieves information about all available video and audio devices using FFmpeg.
 
         Args:
             ffmpegexe (str): The path to the FFmpeg executable.
+            max_workers (int): How many "-list_options" probes may run at the same time.
+                  1 (default) probes one device after another.
+            cache_dir (str, optional): Folder for an on-disk cache of the device inventory.
+                  The cache is keyed by the FFmpeg executable (path, size, mtime) and by the
+                  output of "-list_devices", a hit skips all "-list_options" probes.
+                  Every executable keeps one entry, a new device list replaces it.
+                  The capabilities of the executable (get_capabilities) are kept there too.
+                  None (default) disables the cache.
+            cache_ttl (float, optional): Maximum age of a cache entry in seconds.
+                  None (default) keeps entries until the device list changes
+                  or clear_device_cache is called.
+            lazy (bool): If True, return right after "-list_devices". Each device is a
+                  LazyDevice whose options are a LazyOptions mapping, the "-list_options" probe
+                  runs on first access to the options or to any other key than name and
+                  alternative_name. max_workers is ignored and the result is not written to
+                  the cache. deadline only bounds "-list_devices", the probes run later and
+                  only timeout applies to them. pprint, json.dumps(devices) and iterating a
+                  device load it.
+            compact (bool): If True, the options of each device are an OptionTable, a tuple of
+                  AudioOption/VideoOption records (interned strings, sizes as int width/height)
+                  with .to_dict() for the classic format, .columns() and .to_numpy().
+                  Ignored if lazy is True.
+            backend (str or backend object, optional): "dshow", "v4l2", "alsa", "linux"
+                  (v4l2 + alsa) or a backend instance, e.g. LinuxBackend(sysfs_root=...).
+                  None (default) uses "dshow" on Windows and "linux" everywhere else.
+                  The ffmpeg build is checked once per executable (get_capabilities): a wrong path
+                  raises FileNotFoundError and a build without the input device ValueError,
+                  before any device is probed.
+            timeout (float, optional): Seconds one ffmpeg call may take before it is killed.
+            deadline (float, optional): Seconds the whole enumeration may take. Probes that are
+                  still running at the deadline are killed, later ones are not started.
+                  Raises TimeoutError if "-list_devices" itself does not finish in time.
+                  With lazy=True it does not apply to the "-list_options" probes.
+            stats (EnumerationStats, optional): Records argv, spawn-to-exit latency, stderr bytes
+                  and parse time of every ffmpeg call. None (default) adds no overhead.
+
+        Every device has a "status": "ok", "timed_out" or "failed" ("error" has the reason)
+        and the "elapsed" seconds of its probe. Devices that did not finish have empty options.
+        With lazy=True reading the status runs the probe of the device.
 
         Returns:
             dict: A dictionary containing information about all available devices.
@@ -30,8 +1554,19 @@ def get_all_devices(ffmpegexe: str) -> dict:
             ffmpegexe = r"C:\ffmpeg\ffmpeg.exe"
             devices = get_all_devices(ffmpegexe)
             pp(devices)
+            # probe up to 8 devices concurrently
+            devices = get_all_devices(ffmpegexe, max_workers=8)
+            # reuse the inventory of the last run if no device was added or removed
+            devices = get_all_devices(ffmpegexe, cache_dir=r"C:\ffmpegdevicescache")
+            # only probe the options of the devices that are actually used
+            devices = get_all_devices(ffmpegexe, lazy=True)
+            # typed records, e.g. for filtering modes with numpy
+            devices = get_all_devices(ffmpegexe, compact=True)
+            modes = devices["video"][0]["options"].to_numpy()
+            hd = modes[(modes["max_width"] >= 1280) & (modes["fps"] >= 30)]
 
     {'audio': {0: {'alternative_name': '@device_cm_{33D9A762-90C8-11D0-BD43-00A0C911CE86}\\wave_{70C2267E-6685-4496-B3E7-23FAA519FC58}',
+                   'elapsed': 0.142087,
                    'name': 'Krisp Microphone (Krisp Audio)',
                    'options': {0: {'bits': 16, 'ch': 2, 'rate': 44100},
                                1: {'bits': 16, 'ch': 1, 'rate': 44100},
@@ -54,8 +1589,10 @@ def get_all_devices(ffmpegexe: str) -> dict:
                                18: {'bits': 16, 'ch': 2, 'rate': 48000},
                                19: {'bits': 16, 'ch': 1, 'rate': 48000},
                                20: {'bits': 16, 'ch': 2, 'rate': 96000},
-                               21: {'bits': 16, 'ch': 1, 'rate': 96000}}},
+                               21: {'bits': 16, 'ch': 1, 'rate': 96000}},
+                   'status': 'ok'},
                1: {'alternative_name': '@device_cm_{33D9A762-90C8-11D0-BD43-00A0C911CE86}\\wave_{FC0D8211-5530-4CC1-8B8D-14AC7C65BED9}',
+                   'elapsed': 0.138659,
                    'name': 'Microphone (2- USB Advanced Audio Device)',
                    'options': {0: {'bits': 16, 'ch': 2, 'rate': 44100},
                                1: {'bits': 16, 'ch': 1, 'rate': 44100},
@@ -78,8 +1615,10 @@ def get_all_devices(ffmpegexe: str) -> dict:
                                18: {'bits': 16, 'ch': 2, 'rate': 48000},
                                19: {'bits': 16, 'ch': 1, 'rate': 48000},
                                20: {'bits': 16, 'ch': 2, 'rate': 96000},
-                               21: {'bits': 16, 'ch': 1, 'rate': 96000}}}},
+                               21: {'bits': 16, 'ch': 1, 'rate': 96000}},
+                   'status': 'ok'}},
      'video': {0: {'alternative_name': '@device_pnp_\\\\?\\usb#vid_046d&pid_0892&mi_00#8&222f6f15&0&0000#{65e8773d-8f56-11d0-a3b9-00a0c9223196}\\global',
+                   'elapsed': 0.187431,
                    'name': 'HD Pro Webcam C920',
                    'options': {0: {'fps': 30,
                                    'info': '(tv, bt470bg/bt709/unknown, topleft)',
@@ -260,135 +1799,773 @@ def get_all_devices(ffmpegexe: str) -> dict:
                                     'info': '(pc, bt470bg/bt709/unknown, center)',
                                     'max_s': '1920x1080',
                                     'min_s': '1920x1080',
-                                    'vcodec': 'mjpeg'}}},
+                                    'vcodec': 'mjpeg'}},
+                   'status': 'ok'},
                1: {'alternative_name': '@device_sw_{860BB310-5D01-11D0-BD3B-00A0C911CE86}\\{4A2FEA90-B0A0-438E-8BC3-D84157660D0A}',
+                   'elapsed': 0.093825,
                    'name': 'Logi Capture',
-                   'options': {}},
+                   'options': {},
+                   'status': 'ok'},
                2: {'alternative_name': '@device_sw_{860BB310-5D01-11D0-BD3B-00A0C911CE86}\\{A3FCE0F5-3493-419F-958A-ABA1250EC20B}',
+                   'elapsed': 0.101592,
                    'name': 'OBS Virtual Camera',
-                   'options': {}}}}
+                   'options': {},
+                   'status': 'ok'}}}
 
     """
-    p = subprocess.run(
-        [ffmpegexe, "-list_devices", "true", "-f", "dshow", "-i", "dummy"],
-        capture_output=True,
-        **invisibledict,
+    stream = _stream_devices(
+        ffmpegexe,
+        max_workers,
+        cache_dir,
+        cache_ttl,
+        lazy,
+        compact,
+        backend,
+        timeout,
+        deadline,
+        stats,
     )
-    alldevices = {}
+    return _collect_devices(next(stream), stream)
+
+
+def _stream_devices(
+    ffmpegexe,
+    max_workers,
+    cache_dir,
+    cache_ttl,
+    lazy,
+    compact,
+    backend,
+    timeout,
+    deadline,
+    stats,
+):
+    # yields the "-list_devices" grouping first, then (kind, index, device) in completion order
+    deadline_at = None if deadline is None else time.perf_counter() + deadline
+    backend = _resolve_backend(
+        backend, ffmpegexe, _probe_timeout(timeout, deadline_at), cache_dir, stats
+    )
+    alldevices = _list_devices(
+        backend, ffmpegexe, _probe_timeout(timeout, deadline_at), stats
+    )
+    yield alldevices
+    if cache_dir is not None:
+        cachepath = _cache_path(cache_dir, ffmpegexe, alldevices)
+        alld = _read_cache(cachepath, cache_ttl)
+        if alld is not None:
+            yield from _cached_devices(alld, compact and not lazy)
+            return
 
-    for d in [
-        (q[1][1:-1].decode("utf-8"), q[0].decode("utf-8"), q[-1].decode("utf-8"))
-        for q in [
-            re.findall(
-                rb'("([^"]+)"[^"]+(\([^\)]+\))[^"]+"([^"]+)")',
-                x.replace(b"\n", b" ").replace(b"\r", b" "),
-            )[0][1:]
-            for x in re.findall(
-                rb'(\[[^\]]+\][^\n\r]+\([^\)]+\)[\r\n]+.*?Alternative name\s+"[^\r\n]+)',
-                p.stderr,
-                flags=re.DOTALL,
+    jobs = _device_jobs(alldevices)
+    if lazy:
+        for key, ini, key2, item2 in jobs:
+            yield key, ini, _lazy_device(backend, ffmpegexe, key, key2, item2, timeout, stats)
+        return
+
+    running = _RunningProcesses()
+
+    def probe(job):
+        return _get_options(
+            backend, ffmpegexe, job[0], job[3], compact, timeout, deadline_at, stats, running
+        )
+
+    results = [None] * len(jobs)
+    if max_workers > 1 and len(jobs) > 1:
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)))
+        finished = False
+        try:
+            futures = {executor.submit(probe, job): pos for pos, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                pos = futures[future]
+                results[pos] = future.result()
+                yield _job_device(jobs[pos], results[pos])
+            finished = True
+        finally:
+            # stopping early cancels the probes that have not started yet and kills the
+            # running ones, so no worker thread is left waiting for a hung driver
+            if not finished:
+                executor.shutdown(wait=False, cancel_futures=True)
+                running.kill_all()
+            executor.shutdown(wait=True)
+    else:
+        for pos, job in enumerate(jobs):
+            results[pos] = probe(job)
+            yield _job_device(job, results[pos])
+
+    # incomplete inventories are not cached, the next call retries them
+    if cache_dir is not None and all(result.status == "ok" for result in results):
+        alld = _assemble_devices(alldevices, jobs, results)
+        _write_cache(cachepath, _map_options(alld, _dict_options) if compact else alld)
+
+
+def _job_device(job, result):
+    key, ini, key2, item2 = job
+    return key, ini, _device_record(key2, item2, result)
+
+
+def _cached_devices(alld, compact):
+    for key, devices in alld.items():
+        for ini, device in devices.items():
+            if compact:
+                device = dict(device, options=_compact_options(key, device["options"]))
+            yield key, ini, device
+
+
+def _collect_devices(alldevices, stream):
+    alld = {key: {} for key in alldevices}
+    for key, ini, device in stream:
+        alld[key][ini] = device
+    return {key: dict(sorted(devices.items())) for key, devices in alld.items()}
+
+
+async def _acollect_devices(stream):
+    alld = {key: {} for key in await stream.__anext__()}
+    async for key, ini, device in stream:
+        alld[key][ini] = device
+    return {key: dict(sorted(devices.items())) for key, devices in alld.items()}
+
+
+def iter_devices(
+    ffmpegexe: str,
+    max_workers: int = 1,
+    cache_dir: Optional[str] = None,
+    cache_ttl: Optional[float] = None,
+    lazy: bool = False,
+    compact: bool = False,
+    backend: Union[str, object, None] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[EnumerationStats] = None,
+):
+    r"""
+    Generator version of get_all_devices, yields (kind, index, device) as soon as the
+    "-list_options" probe of a device finishes, in completion order. kind and index are
+    the keys the device has in get_all_devices(), device is the same dict.
+    Stopping early (break, close()) cancels the probes that have not started yet.
+
+    Args: See get_all_devices.
+
+    Example:
+        from ffmpegdevices import iter_devices, ModeResolver
+        for kind, index, device in iter_devices(r"C:\ffmpeg\ffmpeg.exe", max_workers=4):
+            if kind == "video" and device["status"] == "ok" and device["options"]:
+                camera = ModeResolver(device).video_args(1280, 720)
+                break
+    """
+    stream = _stream_devices(
+        ffmpegexe,
+        max_workers,
+        cache_dir,
+        cache_ttl,
+        lazy,
+        compact,
+        backend,
+        timeout,
+        deadline,
+        stats,
+    )
+    next(stream)
+    yield from stream
+
+
+async def get_all_devices_async(
+    ffmpegexe: str,
+    max_workers: int = 4,
+    cache_dir: Optional[str] = None,
+    cache_ttl: Optional[float] = None,
+    compact: bool = False,
+    backend: Union[str, object, None] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[EnumerationStats] = None,
+) -> dict:
+    r"""
+    asyncio version of get_all_devices, it does not block the event loop.
+    The "-list_options" probes run concurrently, at most max_workers at the same time.
+    Cancelling the task kills the running ffmpeg processes.
+    Uses the same parsers and returns the same dict as get_all_devices.
+
+    Args:
+        ffmpegexe (str): The path to the FFmpeg executable.
+        max_workers (int): How many "-list_options" probes may run at the same time (default 4).
+        cache_dir (str, optional): See get_all_devices.
+        cache_ttl (float, optional): See get_all_devices.
+        compact (bool): See get_all_devices.
+        backend (str or backend object, optional): See get_all_devices.
+        timeout (float, optional): See get_all_devices.
+        deadline (float, optional): See get_all_devices.
+        stats (EnumerationStats, optional): See get_all_devices.
+
+    Returns:
+        dict: A dictionary containing information about all available devices.
+
+    Example:
+        import asyncio
+        from ffmpegdevices import get_all_devices_async
+        devices = asyncio.run(get_all_devices_async(r"C:\ffmpeg\ffmpeg.exe"))
+    """
+    return await _acollect_devices(
+        _astream_devices(
+            ffmpegexe, max_workers, cache_dir, cache_ttl, compact, backend, timeout, deadline, stats
+        )
+    )
+
+
+async def _astream_devices(
+    ffmpegexe, max_workers, cache_dir, cache_ttl, compact, backend, timeout, deadline, stats
+):
+    # asyncio counterpart of _stream_devices
+    deadline_at = None if deadline is None else time.perf_counter() + deadline
+    backend = await _aresolve_backend(
+        backend, ffmpegexe, _probe_timeout(timeout, deadline_at), cache_dir, stats
+    )
+    alldevices = _group_devices(
+        await _arun_probe(
+            backend.devices_probe(ffmpegexe), _probe_timeout(timeout, deadline_at), stats
+        )
+    )
+    yield alldevices
+    if cache_dir is not None:
+        cachepath = _cache_path(cache_dir, ffmpegexe, alldevices)
+        alld = _read_cache(cachepath, cache_ttl)
+        if alld is not None:
+            for device in _cached_devices(alld, compact):
+                yield device
+            return
+
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def probe(pos, job):
+        async with semaphore:
+            return pos, await _aget_options(
+                backend, ffmpegexe, job[0], job[3], compact, timeout, deadline_at, stats
             )
-        ]
-    ]:
-        if d[0] not in alldevices:
-            alldevices[d[0]] = {}
-        alldevices[d[0]][d[1]] = d[2]
-
-    def get_audio_options(alt_dev):
-        p1 = subprocess.run(
-            [
-                ffmpegexe,
-                "-list_options",
-                "true",
+
+    jobs = _device_jobs(alldevices)
+    results = [None] * len(jobs)
+    tasks = [asyncio.ensure_future(probe(pos, job)) for pos, job in enumerate(jobs)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            pos, results[pos] = await task
+            yield _job_device(jobs[pos], results[pos])
+    finally:
+        # stopping early cancels the pending probes and kills the running ones
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if cache_dir is not None and all(result.status == "ok" for result in results):
+        alld = _assemble_devices(alldevices, jobs, results)
+        _write_cache(cachepath, _map_options(alld, _dict_options) if compact else alld)
+
+
+async def iter_devices_async(
+    ffmpegexe: str,
+    max_workers: int = 4,
+    cache_dir: Optional[str] = None,
+    cache_ttl: Optional[float] = None,
+    compact: bool = False,
+    backend: Union[str, object, None] = None,
+    timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    stats: Optional[EnumerationStats] = None,
+):
+    r"""
+    Async iterator version of iter_devices, yields (kind, index, device) in completion order.
+    Stopping early cancels the pending probes and kills the running ffmpeg processes,
+    wrap it in contextlib.aclosing() to do that right at the break.
+
+    Args: See get_all_devices_async.
+
+    Example:
+        from contextlib import aclosing
+        from ffmpegdevices import iter_devices_async
+        async with aclosing(iter_devices_async(r"C:\ffmpeg\ffmpeg.exe")) as devices:
+            async for kind, index, device in devices:
+                if kind == "video" and device["options"]:
+                    break
+    """
+    stream = _astream_devices(
+        ffmpegexe, max_workers, cache_dir, cache_ttl, compact, backend, timeout, deadline, stats
+    )
+    try:
+        await stream.__anext__()
+        async for device in stream:
+            yield device
+    finally:
+        await stream.aclose()
+
+
+_POLICIES = ("smallest", "largest")
+
+
+def _check_policy(policy):
+    if policy not in _POLICIES:
+        raise ValueError(f"unknown policy {policy!r}, use one of {list(_POLICIES)}")
+
+
+def _clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+class ModeResolver:
+    r"""
+    Finds the best capture mode of one device for a set of constraints.
+    The modes are indexed once (sorted by pixel count / sample rate, grouped by codec
+    or pixel format), queries bisect into the index and are memoized, so picking a mode
+    for every new session costs microseconds instead of a scan over all options.
+
+    Args:
+        device (dict): One device of get_all_devices(), e.g. devices["video"][0].
+              Works with the dict options and with compact=True / lazy=True options.
+
+    Example:
+        from ffmpegdevices import get_all_devices, ModeResolver
+        devices = get_all_devices(r"C:\ffmpeg\ffmpeg.exe")
+        resolver = ModeResolver(devices["video"][0])
+        resolver.best_video(min_width=1280, min_height=720, min_fps=30, prefer=("mjpeg", "yuyv422"))
+        # VideoOption(pixel_format=None, vcodec='mjpeg', ..., max_width=1280, max_height=720, ...)
+        resolver.video_args(min_width=1280, min_height=720, min_fps=30, prefer=("mjpeg", "yuyv422"))
+        # ['-f', 'dshow', '-video_size', '1280x720', '-framerate', '30', '-vcodec', 'mjpeg',
+        #  '-i', 'video=@device_pnp_\\?\usb#vid_046d&pid_0892...']
+    """
+
+    def __init__(self, device: dict):
+        self.device = device
+        options = device.get("options") or {}
+        if not isinstance(options, OptionTable):
+            options = options.values()
+            options = tuple(
+                AudioOption(o["ch"], o["bits"], o["rate"])
+                if "rate" in o
+                else VideoOption.from_dict(o)
+                for o in options
+            )
+        video = sorted(
+            (o for o in options if isinstance(o, VideoOption)),
+            key=lambda o: (o.max_width * o.max_height, -o.fps),
+        )
+        audio = sorted(
+            (o for o in options if isinstance(o, AudioOption)),
+            key=lambda o: (o.rate, -o.ch),
+        )
+        self._video = self._index(
+            video, lambda o: o.vcodec or o.pixel_format, lambda o: o.max_width * o.max_height
+        )
+        self._audio = self._index(audio, lambda o: o.bits, lambda o: o.rate)
+        self._memo = {}
+
+    @staticmethod
+    def _index(options, groupkey, sortkey):
+        groups = {None: options}
+        for option in options:
+            groups.setdefault(groupkey(option), []).append(option)
+        return {group: ([sortkey(o) for o in items], items) for group, items in groups.items()}
+
+    @staticmethod
+    def _search(index, groups, low, accept, largest):
+        # groups are tried in order of preference, inside a group the items are sorted
+        # by key and ties keep the sort order (higher fps / more channels first)
+        for group in groups:
+            keys, items = index.get(group, ((), ()))
+            start = bisect_left(keys, low)
+            candidates = range(start, len(items))
+            for i in reversed(candidates) if largest else candidates:
+                if accept(items[i]):
+                    if largest:
+                        for j in range(bisect_left(keys, keys[i], start, i), i):
+                            if accept(items[j]):
+                                return items[j]
+                    return items[i]
+        return None
+
+    def _groups(self, index, prefer, strict):
+        groups = [group for group in prefer if group in index]
+        if not strict or not prefer:
+            groups.append(None)
+        return groups
+
+    def best_video(
+        self,
+        min_width: int = 0,
+        min_height: int = 0,
+        min_fps: float = 0,
+        prefer: tuple = (),
+        strict: bool = False,
+        policy: str = "smallest",
+    ) -> Optional[VideoOption]:
+        r"""
+        Returns the best VideoOption or None.
+
+        Args:
+            min_width, min_height, min_fps: lower bounds of the mode. Modes with fps 0
+                  (unknown, v4l2) satisfy any min_fps.
+            prefer (tuple): vcodec / pixel_format names in order of preference, e.g. ("mjpeg", "yuyv422").
+            strict (bool): only accept the formats in prefer.
+            policy (str): "smallest" takes the fewest pixels that satisfy the constraints,
+                  "largest" the most. Among equal sizes the higher frame rate wins.
+                  Raises ValueError for any other policy.
+        """
+        _check_policy(policy)
+        key = ("video", min_width, min_height, min_fps, tuple(prefer), strict, policy)
+        if key not in self._memo:
+            self._memo[key] = self._search(
+                self._video,
+                self._groups(self._video, prefer, strict),
+                min_width * min_height,
+                lambda o: o.max_width >= min_width
+                and o.max_height >= min_height
+                and (o.fps == 0 or o.fps >= min_fps),
+                policy == "largest",
+            )
+        return self._memo[key]
+
+    def best_audio(
+        self,
+        min_rate: int = 0,
+        channels: Optional[int] = None,
+        prefer_bits: tuple = (16,),
+        strict: bool = False,
+        policy: str = "smallest",
+    ) -> Optional[AudioOption]:
+        r"""
+        Returns the best AudioOption or None.
+
+        Args:
+            min_rate (int): lowest acceptable sample rate.
+            channels (int, optional): exact number of channels, None accepts any.
+            prefer_bits (tuple): sample sizes in order of preference, e.g. (16, 24).
+            strict (bool): only accept the sample sizes in prefer_bits.
+            policy (str): "smallest" takes the lowest sample rate that satisfies the
+                  constraints, "largest" the highest. Among equal rates more channels win.
+                  Raises ValueError for any other policy.
+        """
+        _check_policy(policy)
+        key = ("audio", min_rate, channels, tuple(prefer_bits), strict, policy)
+        if key not in self._memo:
+            self._memo[key] = self._search(
+                self._audio,
+                self._groups(self._audio, prefer_bits, strict),
+                min_rate,
+                lambda o: channels is None or o.ch == channels,
+                policy == "largest",
+            )
+        return self._memo[key]
+
+    def input_args(
+        self,
+        option: Union[VideoOption, AudioOption],
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fps: Optional[float] = None,
+    ) -> list:
+        r"""
+        Returns the ffmpeg input arguments that open this device with option.
+        Devices of the v4l2 ("/dev/...") and alsa ("hw:...") backends get "-f v4l2" / "-f alsa"
+        arguments, all others "-f dshow".
+
+        Video modes are opened at their max size and frame rate. For a range mode
+        (min_s != max_s) width and height pick the size inside the range instead,
+        fps does the same for a frame rate range and is sent as is for an unknown frame
+        rate (fps 0). Values outside the range are clamped.
+        """
+        alt_dev = self.device["alternative_name"]
+        if isinstance(option, AudioOption):
+            if alt_dev.startswith("hw:"):
+                return [
+                    "-f",
+                    "alsa",
+                    "-sample_rate",
+                    str(option.rate),
+                    "-channels",
+                    str(option.ch),
+                    "-i",
+                    alt_dev,
+                ]
+            return [
                 "-f",
                 "dshow",
+                "-sample_rate",
+                str(option.rate),
+                "-sample_size",
+                str(option.bits),
+                "-channels",
+                str(option.ch),
                 "-i",
                 f"audio={alt_dev}",
-            ],
-            capture_output=True,**invisibledict
-        )
-        return {
-            list(j.keys())[0]: list(j.items())[0][-1]
-            for j in [
-                {ini: {"ch": q[0], "bits": q[1], "rate": q[2]}}
-                for ini, q in enumerate(
-                    [
-                        [int(z.split("=")[-1].strip()) for z in y if len(y) == 3]
-                        for y in [
-                            x.split(b"] ")[-1]
-                            .strip()
-                            .decode("utf-8")
-                            .split(", ", maxsplit=2)
-                            for x in p1.stderr.strip().splitlines()
-                            if x[0] == 91 and b"=" in x
-                        ]
-                    ]
-                )
             ]
-        }
-
-    def get_video_options(alt_dev):
-        p2 = subprocess.run(
-            [
-                ffmpegexe,
-                "-list_options",
-                "true",
+        size = (option.max_width, option.max_height)
+        if width is not None and (option.min_width, option.min_height) != size:
+            size = (
+                _clamp(width, option.min_width, option.max_width),
+                _clamp(height or 0, option.min_height, option.max_height),
+            )
+        size = "%dx%d" % size
+        rate = option.fps
+        if fps is not None and not option.fps:
+            rate = fps
+        elif fps is not None and option.min_fps != option.fps:
+            rate = _clamp(fps, option.min_fps, option.fps)
+        if alt_dev.startswith("/dev/"):
+            framerate = ["-framerate", str(rate)] if rate else []
+            return [
                 "-f",
-                "dshow",
+                "v4l2",
+                "-video_size",
+                size,
+                *framerate,
+                "-input_format",
+                option.vcodec or option.pixel_format,
                 "-i",
-                f"video={alt_dev}",
-            ],
-            capture_output=True,**invisibledict
-        )
-        return {
-            ini: u
-            for ini, u in enumerate(
-                [
-                    {
-                        q[0]: (
-                            int(float(q[1]))
-                            if float(q[1]).is_integer()
-                            else float(q[1])
-                        )
-                        if q[0] == "fps"
-                        else q[1]
-                        for q in dict(
-                            z.split("=") if "=" in z else ("info", z) for z in y
-                        ).items()
-                    }
-                    for y in [
-                        re.split(
-                            r"\s+",
-                            x.decode("utf-8")
-                            .replace("max s", "max_s")
-                            .replace("min s", "min_s"),
-                            maxsplit=5,
-                        )
-                        for x in [
-                            x.split(b"] ")[-1].strip()
-                            for x in p2.stderr.strip().splitlines()
-                            if x[0] == 91 and b"=" in x and b"(" in x
-                        ]
-                    ]
-                ]
+                alt_dev,
+            ]
+        if option.vcodec:
+            fmt = ["-vcodec", option.vcodec]
+        else:
+            fmt = ["-pixel_format", option.pixel_format]
+        return [
+            "-f",
+            "dshow",
+            "-video_size",
+            size,
+            "-framerate",
+            str(rate),
+            *fmt,
+            "-i",
+            f"video={alt_dev}",
+        ]
+
+    def video_args(
+        self,
+        min_width: int = 0,
+        min_height: int = 0,
+        min_fps: float = 0,
+        prefer: tuple = (),
+        strict: bool = False,
+        policy: str = "smallest",
+    ) -> list:
+        r"""
+        best_video() as ffmpeg input arguments, raises LookupError if no mode matches.
+        With policy "smallest" a range mode is opened at the requested size and frame rate
+        (clamped into the range, without min_fps at the max frame rate), with "largest"
+        at its max.
+        """
+        option = self.best_video(min_width, min_height, min_fps, prefer, strict, policy)
+        if option is None:
+            raise LookupError(
+                f"{self.device.get('name')}: no video mode matches "
+                f"{min_width}x{min_height} fps={min_fps} prefer={prefer} strict={strict}"
             )
+        if policy == "largest":
+            return self.input_args(option)
+        return self.input_args(option, min_width, min_height, min_fps or None)
+
+    def audio_args(self, *args, **kwargs) -> list:
+        r"""
+        best_audio() as ffmpeg input arguments, raises LookupError if no mode matches.
+        """
+        option = self.best_audio(*args, **kwargs)
+        if option is None:
+            raise LookupError(f"{self.device.get('name')}: no audio mode matches {args} {kwargs}")
+        return self.input_args(option)
+
+
+class DeviceEvent(NamedTuple):
+    r"""
+    A change reported by DeviceWatcher.
+
+    type is "added", "removed" or "changed" (same alternative_name, new name or kind),
+    kind is "video" or "audio", device is the device dict in the get_all_devices format.
+    """
+
+    type: str
+    kind: str
+    device: dict
+
+
+class DeviceWatcher:
+    r"""
+    Detects plugged and unplugged devices. Every poll runs only the cheap "-list_devices" call
+    and diffs it by alternative_name against the previous snapshot. "-list_options" only runs
+    for devices that were added. The interval doubles from min_interval up to max_interval
+    while nothing changes and drops back to min_interval after a change.
+
+    The first poll reports every connected device as "added".
+
+    Args:
+        ffmpegexe (str): The path to the FFmpeg executable.
+        callback (callable, optional): Called with every DeviceEvent by start().
+        min_interval (float): Seconds between polls right after a change (default 1).
+        max_interval (float): Longest interval while nothing changes (default 10).
+        max_workers (int): See get_all_devices, used for the probes of added devices.
+        compact (bool): See get_all_devices.
+        backend (str or backend object, optional): See get_all_devices.
+        timeout (float, optional): See get_all_devices, for every ffmpeg call of a poll.
+        stats (EnumerationStats, optional): See get_all_devices, collects the ffmpeg calls
+              of every poll.
+
+    Example:
+        from ffmpegdevices import DeviceWatcher
+        # iterator, blocks between polls
+        for event in DeviceWatcher(r"C:\ffmpeg\ffmpeg.exe"):
+            print(event.type, event.kind, event.device["name"])
+
+        # background thread with a callback
+        watcher = DeviceWatcher(r"C:\ffmpeg\ffmpeg.exe", callback=print)
+        watcher.start()
+        ...
+        watcher.stop()
+        watcher.devices  # the current inventory, like get_all_devices()
+    """
+
+    def __init__(
+        self,
+        ffmpegexe: str,
+        callback=None,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        max_workers: int = 1,
+        compact: bool = False,
+        backend: Union[str, object, None] = None,
+        timeout: Optional[float] = None,
+        stats: Optional[EnumerationStats] = None,
+    ):
+        self.ffmpegexe = ffmpegexe
+        self.backend = _resolve_backend(backend, ffmpegexe, timeout, stats=stats)
+        self.timeout = timeout
+        self.stats = stats
+        self.callback = callback
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+        self.compact = compact
+        self.interval = min_interval
+        self.error = None
+        self.polled_at = None
+        self._known = {}
+        self._listing = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def devices(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    ini: self._known[alt_dev]["device"]
+                    for ini, alt_dev in enumerate(items.values())
+                }
+                for key, items in self._listing.items()
+            }
+
+    def poll(self) -> list:
+        r"""
+        Runs one "-list_devices" call and returns the DeviceEvents since the last poll.
+        """
+        with self._poll_lock:
+            events = self._poll()
+            self.polled_at = time.time()
+        return events
+
+    def _poll(self):
+        listing = _list_devices(self.backend, self.ffmpegexe, self.timeout, stats=self.stats)
+        current = {
+            alt_dev: (key, name)
+            for key, items in listing.items()
+            for name, alt_dev in items.items()
         }
+        # only _poll changes _known (under _poll_lock), readers of devices see the old
+        # snapshot until the whole change is applied in one step after the probes
+        with self._lock:
+            known = dict(self._known)
+        added = [(key, alt_dev) for alt_dev, (key, _) in current.items() if alt_dev not in known]
+
+        def probe(job):
+            return _get_options(
+                self.backend,
+                self.ffmpegexe,
+                job[0],
+                job[1],
+                self.compact,
+                self.timeout,
+                stats=self.stats,
+            )
+
+        if len(added) > 1 and self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(added))) as executor:
+                results = list(executor.map(probe, added))
+        else:
+            results = [probe(job) for job in added]
+        events = []
+        for alt_dev, device in list(known.items()):
+            if alt_dev not in current:
+                del known[alt_dev]
+                events.append(DeviceEvent("removed", device["kind"], device["device"]))
+            elif current[alt_dev] != (device["kind"], device["device"]["name"]):
+                key, name = current[alt_dev]
+                device = {"kind": key, "device": dict(device["device"], name=name)}
+                known[alt_dev] = device
+                events.append(DeviceEvent("changed", key, device["device"]))
+        for (key, alt_dev), result in zip(added, results):
+            device = _device_record(current[alt_dev][1], alt_dev, result)
+            known[alt_dev] = {"kind": key, "device": device}
+            events.append(DeviceEvent("added", key, device))
+        with self._lock:
+            self._known = known
+            self._listing = listing
+        if events:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return events
 
-    alld = {}
-    for key, items in alldevices.items():
-        if not key in alld:
-            alld[key] = {}
-        ini = 0
-        for key2, item2 in items.items():
+    def __iter__(self):
+        self._stop.clear()
+        while not self._stop.is_set():
+            yield from self.poll()
+            self._stop.wait(self.interval)
+
+    def _run(self):
+        # after a poll() (e.g. InventoryServer.start) the first poll of the thread waits
+        if self.polled_at is not None:
+            self._stop.wait(self.interval)
+        while not self._stop.is_set():
             try:
-                if key == "audio":
-                    opt = get_audio_options(alt_dev=item2)
-                else:
-                    opt = get_video_options(alt_dev=item2)
+                events = self.poll()
+                self.error = None
             except Exception as e:
-                opt = {"ERROR": str(e)}
+                self.error = e
+                self.interval = self.max_interval
+                events = []
+            for event in events:
+                self.callback(event)
+            self._stop.wait(self.interval)
 
-            alld[key][ini] = {"name": key2, "alternative_name": item2, "options": opt}
-            ini += 1
+    def start(self) -> "DeviceWatcher":
+        r"""
+        Polls in a daemon thread and calls callback for every event.
+        If poll() already ran, the thread waits one interval before its first poll.
+        """
+        if self.callback is None:
+            raise ValueError("DeviceWatcher.start() needs a callback")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="DeviceWatcher", daemon=True)
+        self._thread.start()
+        return self
 
-    return alld
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+
+def __getattr__(name):
+    # the inventory daemon imports socket/socketserver, it is only loaded when it is used
+    if name in ("DEFAULT_SOCKET", "InventoryServer", "get_all_devices_from_daemon"):
+        from . import daemon
+
+        return getattr(daemon, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,85 @@
+r"""
+Command line interface, prints the inventory as JSON or runs the inventory daemon.
+
+    python -m ffmpegdevices [ffmpegexe]             enumerates and prints the inventory
+    python -m ffmpegdevices [ffmpegexe] --daemon    asks a running daemon, else enumerates
+    python -m ffmpegdevices [ffmpegexe] --serve     runs the daemon (InventoryServer) on --socket
+
+The daemon enumerates once, keeps the inventory fresh and answers "devices", "refresh"
+and "ping" on a Unix domain socket, see InventoryServer.
+"""
+
+import argparse
+import json
+import signal
+import sys
+
+from . import get_all_devices
+from .daemon import DEFAULT_SOCKET, InventoryServer, get_all_devices_from_daemon
+
+
+def _log_event(event):
+    print(f"{event.type} {event.kind} {event.device['name']}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ffmpegdevices",
+        description="Lists the capture devices that ffmpeg sees.",
+    )
+    parser.add_argument("ffmpegexe", nargs="?", default="ffmpeg")
+    parser.add_argument("--backend", help='"dshow", "v4l2", "alsa" or "linux"')
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--timeout", type=float, help="seconds per ffmpeg call")
+    parser.add_argument("--deadline", type=float, help="seconds for the whole enumeration")
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--cache-ttl", type=float)
+    parser.add_argument("--indent", type=int, help="indent of the JSON output")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="socket of the daemon")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--daemon", action="store_true", help="ask a running daemon first")
+    mode.add_argument("--serve", action="store_true", help="run the daemon")
+    parser.add_argument("--min-interval", type=float, default=1.0)
+    parser.add_argument("--max-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        # SIGTERM stops the daemon like Ctrl+C, the socket file is removed
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            InventoryServer(
+                args.ffmpegexe,
+                args.socket,
+                _log_event,
+                args.min_interval,
+                args.max_interval,
+                args.max_workers,
+                args.backend,
+                args.timeout,
+            ).serve_forever()
+        except (OSError, ValueError, TimeoutError) as e:
+            parser.exit(1, f"{parser.prog}: {e}\n")
+        return 0
+
+    kwargs = {
+        "max_workers": args.max_workers,
+        "cache_dir": args.cache_dir,
+        "cache_ttl": args.cache_ttl,
+        "backend": args.backend,
+        "timeout": args.timeout,
+        "deadline": args.deadline,
+    }
+    # a wrong path, a build without the input device or a stuck "-list_devices"
+    try:
+        if args.daemon:
+            devices = get_all_devices_from_daemon(args.ffmpegexe, args.socket, **kwargs)
+        else:
+            devices = get_all_devices(args.ffmpegexe, **kwargs)
+    except (OSError, ValueError, TimeoutError) as e:
+        parser.exit(1, f"{parser.prog}: {e}\n")
+    print(json.dumps(devices, indent=args.indent))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
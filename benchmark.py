@@ -0,0 +1,184 @@
+r"""
+Benchmarks get_all_devices against fakeffmpeg.py, no Windows or capture hardware needed.
+
+    python -m ffmpegdevices.benchmark
+    python -m ffmpegdevices.benchmark --devices 1 10 100 500 --options 0 50 5000 --latency 0.05 --max-workers 8
+
+For the recorded README fixture and for every devices x options combination it reports:
+
+    parse   time the parsers need for the complete replayed stderr, in process, no subprocess
+    spawn   wall time of one fake ffmpeg call that lists no devices (subprocess overhead)
+    total   wall time of get_all_devices, 1 + devices fake ffmpeg calls
+    peak    peak Python memory allocated during get_all_devices (tracemalloc)
+
+opts/dev is the largest number of options of one device.
+
+Every number is the best of --repeat runs.
+"""
+
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from . import (
+    DshowBackend,
+    _AudioOptionsParser,
+    _DeviceListParser,
+    _VideoOptionsParser,
+    _list_devices,
+    get_all_devices,
+)
+from . import fakeffmpeg
+
+
+def make_fake_ffmpeg(folder: str) -> str:
+    r"""
+    Writes an executable "ffmpeg" launcher for fakeffmpeg.py into folder and returns its path.
+    """
+    if os.name == "nt":
+        raise OSError(
+            "the fake ffmpeg launcher is a shell script, run the benchmark on Linux or macOS"
+        )
+    path = os.path.join(folder, "ffmpeg")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{fakeffmpeg.__file__}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def _set_fixture(fixture, devices=0, options=0, latency=0.0):
+    os.environ["FAKEFFMPEG_FIXTURE"] = fixture
+    os.environ["FAKEFFMPEG_DEVICES"] = str(devices)
+    os.environ["FAKEFFMPEG_OPTIONS"] = str(options)
+    os.environ["FAKEFFMPEG_LATENCY"] = str(latency)
+
+
+def _encoded(lines):
+    return [line.encode("utf-8") for line in lines]
+
+
+def parse_time(devices) -> float:
+    r"""
+    Seconds the parsers need for the stderr of a complete enumeration of devices.
+    """
+    listing = _encoded(
+        fakeffmpeg.render(["-list_devices", "true", "-f", "dshow", "-i", "dummy"], devices)[0]
+    )
+    probes = [
+        (
+            kind,
+            _encoded(
+                fakeffmpeg.render(
+                    ["-list_options", "true", "-f", "dshow", "-i", f"{kind}={alt_dev}"],
+                    devices,
+                )[0]
+            ),
+        )
+        for kind, _, alt_dev, _ in devices
+    ]
+    start = time.perf_counter()
+    parser = _DeviceListParser()
+    for line in listing:
+        parser.feed(line)
+    for kind, lines in probes:
+        parser = _AudioOptionsParser() if kind == "audio" else _VideoOptionsParser()
+        for line in lines:
+            parser.feed(line)
+    return time.perf_counter() - start
+
+
+def run_scenario(ffmpegexe, fixture, devices=0, options=0, latency=0.0, max_workers=1, repeat=3):
+    _set_fixture(fixture, devices, options, latency)
+    fixturedevices = fakeffmpeg.configured_devices()
+    result = {
+        "fixture": fixture,
+        "devices": len(fixturedevices),
+        "options": max((len(d[3]) for d in fixturedevices), default=0),
+        "parse": min(parse_time(fixturedevices) for _ in range(repeat)),
+    }
+    _set_fixture("synthetic", 0, 0, latency)
+    spawn = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _list_devices(DshowBackend(), ffmpegexe)
+        spawn.append(time.perf_counter() - start)
+    result["spawn"] = min(spawn)
+    _set_fixture(fixture, devices, options, latency)
+    total, peak = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        get_all_devices(ffmpegexe, max_workers=max_workers, backend="dshow")
+        total.append(time.perf_counter() - start)
+        peak.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    result["total"] = min(total)
+    result["peak"] = min(peak)
+    return result
+
+
+def _format_row(result):
+    return (
+        f"{result['fixture']:>9} {result['devices']:>7} {result['options']:>9} "
+        f"{result['parse'] * 1000:>10.2f} {result['spawn'] * 1000:>10.2f} "
+        f"{result['total'] * 1000:>11.2f} {result['peak'] / 1024:>10.1f}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ffmpegdevices.benchmark",
+        description="Benchmarks get_all_devices against a fake ffmpeg.",
+    )
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument(
+        "--options", type=int, nargs="+", default=[0, 50, 500], help="options per device"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds every fake ffmpeg call sleeps"
+    )
+    parser.add_argument("--max-workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'fixture':>9} {'devices':>7} {'opts/dev':>9} {'parse ms':>10} "
+        f"{'spawn ms':>10} {'total ms':>11} {'peak KiB':>10}"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        ffmpegexe = make_fake_ffmpeg(folder)
+        print(
+            _format_row(
+                run_scenario(
+                    ffmpegexe,
+                    "recorded",
+                    latency=args.latency,
+                    max_workers=args.max_workers,
+                    repeat=args.repeat,
+                )
+            )
+        )
+        for devices in args.devices:
+            for options in args.options:
+                print(
+                    _format_row(
+                        run_scenario(
+                            ffmpegexe,
+                            "synthetic",
+                            devices,
+                            options,
+                            args.latency,
+                            args.max_workers,
+                            args.repeat,
+                        )
+                    ),
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+r"""
+Inventory daemon: InventoryServer keeps the inventory of one host fresh and serves it to local
+processes over a Unix domain socket, get_all_devices_from_daemon is the client.
+Also available as ffmpegdevices.InventoryServer etc., imported on first use.
+"""
+
+import getpass
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from functools import partial
+from typing import Optional, Union
+
+from . import (
+    DeviceWatcher,
+    _compact_options,
+    _map_options,
+    _restore_int_keys,
+    get_all_devices,
+)
+
+
+def _default_socket():
+    # a private runtime folder if the session has one, else a per-user name in the temp folder
+    if os.environ.get("FFMPEGDEVICES_SOCKET"):
+        return os.environ["FFMPEGDEVICES_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "ffmpegdevices.sock")
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"ffmpegdevices-{user}.sock")
+
+
+DEFAULT_SOCKET = _default_socket()
+
+
+def _check_owner(socket_path):
+    # in a shared temp folder another user could have created the socket first
+    if hasattr(os, "getuid") and os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to another user")
+
+
+def _daemon_request(socket_path, command, timeout):
+    _check_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(command.encode("ascii") + b"\n")
+        data = b"".join(iter(partial(sock.recv, 65536), b""))
+    return json.loads(data)
+
+
+def _claim_socket(socket_path):
+    # a socket file without a listener is left over from a daemon that was killed
+    if not os.path.exists(socket_path):
+        return
+    _check_owner(socket_path)
+    try:
+        _daemon_request(socket_path, "ping", 1.0)
+    except (OSError, ValueError):
+        os.unlink(socket_path)
+    else:
+        raise OSError(f"an InventoryServer is already listening on {socket_path}")
+
+
+class _InventoryHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        command = self.rfile.readline(64).strip().decode("ascii", "replace")
+        reply = self.server.inventory.reply(command)
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class InventoryServer:
+    r"""
+    Enumerates once, keeps the inventory fresh with a DeviceWatcher and serves it to local
+    processes over a Unix domain socket, so N workers on a host share one set of ffmpeg calls.
+    Devices are only probed when they are plugged in, every poll is one "-list_devices" call.
+
+    Protocol: the client connects, sends one line and reads one line of JSON until EOF.
+        devices   {"devices": <get_all_devices() dict>, "age": <seconds since the last poll>}
+        refresh   polls first, then like devices
+        ping      {"pong": true}
+    Errors are answered with {"error": "..."}.
+
+    Args:
+        ffmpegexe (str): The path to the FFmpeg executable.
+        socket_path (str, optional): Defaults to DEFAULT_SOCKET, $FFMPEGDEVICES_SOCKET,
+              ffmpegdevices.sock in $XDG_RUNTIME_DIR or ffmpegdevices-<uid>.sock in the temp
+              folder. The socket is only accessible to the user (mode 0600), a socket of
+              another user is never used.
+        callback (callable, optional): Called with every DeviceEvent, e.g. for logging.
+        min_interval, max_interval, max_workers, backend, timeout: See DeviceWatcher.
+
+    Example:
+        from ffmpegdevices import InventoryServer
+        InventoryServer("ffmpeg").serve_forever()
+
+        # or from the shell
+        python -m ffmpegdevices ffmpeg --serve
+    """
+
+    def __init__(
+        self,
+        ffmpegexe: str,
+        socket_path: Optional[str] = None,
+        callback=None,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        max_workers: int = 1,
+        backend: Union[str, object, None] = None,
+        timeout: Optional[float] = None,
+    ):
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not available on this platform")
+        self.socket_path = socket_path or DEFAULT_SOCKET
+        self.callback = callback
+        self.watcher = DeviceWatcher(
+            ffmpegexe,
+            self._on_event,
+            min_interval,
+            max_interval,
+            max_workers,
+            False,
+            backend,
+            timeout,
+        )
+        self._server = None
+
+    def _on_event(self, event):
+        if self.callback is not None:
+            self.callback(event)
+
+    def reply(self, command: str) -> dict:
+        r"""
+        The answer to one protocol command.
+        """
+        if command == "ping":
+            return {"pong": True}
+        if command == "refresh":
+            try:
+                for event in self.watcher.poll():
+                    self._on_event(event)
+            except Exception as e:
+                return {"error": str(e)}
+        elif command != "devices":
+            return {"error": f"unknown command {command!r}"}
+        if self.watcher.polled_at is None:
+            return {"error": str(self.watcher.error or "no inventory yet")}
+        return {"devices": self.watcher.devices, "age": time.time() - self.watcher.polled_at}
+
+    def start(self) -> "InventoryServer":
+        r"""
+        Runs the first enumeration, then polls and serves in daemon threads.
+        Raises OSError if another server listens on socket_path or it belongs to another user.
+        """
+        _claim_socket(self.socket_path)
+        for event in self.watcher.poll():
+            self._on_event(event)
+        self._server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _InventoryHandler
+        )
+        os.chmod(self.socket_path, 0o600)
+        self._server.daemon_threads = True
+        self._server.inventory = self
+        self.watcher.start()
+        threading.Thread(
+            target=self._server.serve_forever, name="InventoryServer", daemon=True
+        ).start()
+        return self
+
+    def serve_forever(self) -> None:
+        r"""
+        start() and block until stop() or KeyboardInterrupt.
+        """
+        self.start()
+        try:
+            while self._server is not None:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        server.shutdown()
+        server.server_close()
+        self.watcher.stop()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_all_devices_from_daemon(
+    ffmpegexe: str = "ffmpeg",
+    socket_path: Optional[str] = None,
+    socket_timeout: float = 5.0,
+    **kwargs,
+) -> dict:
+    r"""
+    Asks the InventoryServer at socket_path for the inventory and falls back to
+    get_all_devices(ffmpegexe, **kwargs) if no server answers.
+    The inventory of a server is returned as it is, its ffmpegexe and backend apply.
+
+    Args:
+        ffmpegexe (str): The path to the FFmpeg executable, used for the fallback.
+        socket_path (str, optional): See InventoryServer.
+        socket_timeout (float): Seconds to wait for the server (default 5).
+        **kwargs: Passed to get_all_devices. compact=True also applies to the server reply.
+
+    Example:
+        from ffmpegdevices import get_all_devices_from_daemon
+        devices = get_all_devices_from_daemon(r"C:\ffmpeg\ffmpeg.exe", max_workers=4)
+    """
+    if hasattr(socket, "AF_UNIX"):
+        try:
+            reply = _daemon_request(socket_path or DEFAULT_SOCKET, "devices", socket_timeout)
+        except (OSError, ValueError):
+            reply = {}
+        if "devices" in reply:
+            alld = _restore_int_keys(reply["devices"])
+            return _map_options(alld, _compact_options) if kwargs.get("compact") else alld
+    return get_all_devices(ffmpegexe, **kwargs)
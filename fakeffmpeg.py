@@ -0,0 +1,348 @@
+r"""
+Stand-in for ffmpeg that replays the stderr of the dshow "-list_devices" and "-list_options" calls
+and of "-f v4l2 -list_formats all" (the recorded C920 for every /dev/video* input),
+"-version" and "-devices" print the build information to stdout.
+Used by ffmpegdevices.benchmark to measure get_all_devices without Windows or capture hardware.
+
+Configured through environment variables:
+
+    FAKEFFMPEG_FIXTURE   "recorded" (default): the devices of the README example
+                         "synthetic": generated devices, see below
+    FAKEFFMPEG_DEVICES   number of synthetic devices, half video, half audio (default 4)
+    FAKEFFMPEG_OPTIONS   number of options per synthetic device (default 20)
+    FAKEFFMPEG_LATENCY   seconds every invocation sleeps before it writes (default 0)
+    FAKEFFMPEG_PLUGGED   path of a text file with one device name per line, only these
+                         devices are connected. Rewrite the file to simulate hot-plugging.
+                         "Old Name=>New Name" connects a device under a new name (same
+                         alternative name), e.g. after a driver update.
+                         If the file does not exist, all devices are connected.
+    FAKEFFMPEG_HANG      the invocation hangs (sleeps an hour) after the banner if any
+                         argument contains this text, e.g. a device name
+    FAKEFFMPEG_VERSION   version of "-version" and of the banner (default 6.0-full_build-www.gyan.dev),
+                         below 5 "-list_devices" prints the old layout with
+                         "DirectShow video devices" / "DirectShow audio devices" headers
+    FAKEFFMPEG_INPUTS    comma separated input devices of "-devices" (default alsa,dshow,lavfi,v4l2)
+
+Example:
+    python fakeffmpeg.py -list_devices true -f dshow -i dummy
+    FAKEFFMPEG_FIXTURE=synthetic FAKEFFMPEG_DEVICES=500 python fakeffmpeg.py -list_devices true -f dshow -i dummy
+"""
+
+import os
+import sys
+import time
+
+TAG = "[dshow @ 000001f1e1b0a0c0] "
+
+VERSION = "6.0-full_build-www.gyan.dev"
+
+BANNER = [
+    f"ffmpeg version {VERSION} Copyright (c) 2000-2023 the FFmpeg developers",
+    "  built with gcc 12.2.0 (Rev10, Built by MSYS2 project)",
+    "  configuration: --enable-gpl --enable-version3 --enable-static",
+    "  libavutil      58.  2.100 / 58.  2.100",
+    "  libavcodec     60.  3.100 / 60.  3.100",
+    "  libavformat    60.  3.100 / 60.  3.100",
+    "  libavdevice    60.  1.100 / 60.  1.100",
+]
+
+# "-devices" flags and descriptions of the input devices FAKEFFMPEG_INPUTS can name
+INPUT_DEVICES = {
+    "alsa": ("DE", "ALSA audio output"),
+    "dshow": ("D ", "DirectShow capture"),
+    "gdigrab": ("D ", "GDI API Windows frame grabber"),
+    "lavfi": ("D ", "Libavfilter virtual input device"),
+    "v4l2": ("DE", "Video4Linux2 output device"),
+}
+
+# recorded from a HD Pro Webcam C920 and two microphones, see README.MD
+RECORDED_VIDEO_OPTIONS = """
+  pixel_format=yuyv422  min s=640x480 fps=30 max s=640x480 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=160x90 fps=30 max s=160x90 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=160x120 fps=30 max s=160x120 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=176x144 fps=30 max s=176x144 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=320x180 fps=30 max s=320x180 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=320x240 fps=30 max s=320x240 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=352x288 fps=30 max s=352x288 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=432x240 fps=30 max s=432x240 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=640x360 fps=30 max s=640x360 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=800x448 fps=30 max s=800x448 fps=30 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=800x600 fps=24 max s=800x600 fps=24 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=864x480 fps=24 max s=864x480 fps=24 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=960x720 fps=15 max s=960x720 fps=15 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=1024x576 fps=15 max s=1024x576 fps=15 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=1280x720 fps=10 max s=1280x720 fps=10 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=1600x896 fps=7.5 max s=1600x896 fps=7.5 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=1920x1080 fps=5 max s=1920x1080 fps=5 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=2304x1296 fps=2 max s=2304x1296 fps=2 (tv, bt470bg/bt709/unknown, topleft)
+  pixel_format=yuyv422  min s=2304x1536 fps=2 max s=2304x1536 fps=2 (tv, bt470bg/bt709/unknown, topleft)
+  vcodec=mjpeg  min s=640x480 fps=30 max s=640x480 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=160x90 fps=30 max s=160x90 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=160x120 fps=30 max s=160x120 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=176x144 fps=30 max s=176x144 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=320x180 fps=30 max s=320x180 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=320x240 fps=30 max s=320x240 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=352x288 fps=30 max s=352x288 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=432x240 fps=30 max s=432x240 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=640x360 fps=30 max s=640x360 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=800x448 fps=30 max s=800x448 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=800x600 fps=30 max s=800x600 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=864x480 fps=30 max s=864x480 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=960x720 fps=30 max s=960x720 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=1024x576 fps=30 max s=1024x576 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=1280x720 fps=30 max s=1280x720 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=1600x896 fps=30 max s=1600x896 fps=30 (pc, bt470bg/bt709/unknown, center)
+  vcodec=mjpeg  min s=1920x1080 fps=30 max s=1920x1080 fps=30 (pc, bt470bg/bt709/unknown, center)
+""".strip("\n").splitlines()
+
+RECORDED_AUDIO_OPTIONS = """
+  ch= 2, bits=16, rate= 44100
+  ch= 1, bits=16, rate= 44100
+  ch= 2, bits=16, rate= 32000
+  ch= 1, bits=16, rate= 32000
+  ch= 2, bits=16, rate= 22050
+  ch= 1, bits=16, rate= 22050
+  ch= 2, bits=16, rate= 11025
+  ch= 1, bits=16, rate= 11025
+  ch= 2, bits=16, rate=  8000
+  ch= 1, bits=16, rate=  8000
+  ch= 2, bits= 8, rate= 44100
+  ch= 1, bits= 8, rate= 44100
+  ch= 2, bits= 8, rate= 22050
+  ch= 1, bits= 8, rate= 22050
+  ch= 2, bits= 8, rate= 11025
+  ch= 1, bits= 8, rate= 11025
+  ch= 2, bits= 8, rate=  8000
+  ch= 1, bits= 8, rate=  8000
+  ch= 2, bits=16, rate= 48000
+  ch= 1, bits=16, rate= 48000
+  ch= 2, bits=16, rate= 96000
+  ch= 1, bits=16, rate= 96000
+""".strip("\n").splitlines()
+
+RECORDED_DEVICES = [
+    (
+        "video",
+        "HD Pro Webcam C920",
+        r"@device_pnp_\\?\usb#vid_046d&pid_0892&mi_00#8&222f6f15&0&0000#{65e8773d-8f56-11d0-a3b9-00a0c9223196}\global",
+        RECORDED_VIDEO_OPTIONS,
+    ),
+    (
+        "video",
+        "Logi Capture",
+        r"@device_sw_{860BB310-5D01-11D0-BD3B-00A0C911CE86}\{4A2FEA90-B0A0-438E-8BC3-D84157660D0A}",
+        [],
+    ),
+    (
+        "video",
+        "OBS Virtual Camera",
+        r"@device_sw_{860BB310-5D01-11D0-BD3B-00A0C911CE86}\{A3FCE0F5-3493-419F-958A-ABA1250EC20B}",
+        [],
+    ),
+    (
+        "audio",
+        "Krisp Microphone (Krisp Audio)",
+        r"@device_cm_{33D9A762-90C8-11D0-BD43-00A0C911CE86}\wave_{70C2267E-6685-4496-B3E7-23FAA519FC58}",
+        RECORDED_AUDIO_OPTIONS,
+    ),
+    (
+        "audio",
+        "Microphone (2- USB Advanced Audio Device)",
+        r"@device_cm_{33D9A762-90C8-11D0-BD43-00A0C911CE86}\wave_{FC0D8211-5530-4CC1-8B8D-14AC7C65BED9}",
+        RECORDED_AUDIO_OPTIONS,
+    ),
+]
+
+RECORDED_V4L2_FORMATS = [
+    "[video4linux2,v4l2 @ 0x5581cbd0f2c0] Raw       :     yuyv422 :           YUYV 4:2:2 : "
+    "640x480 160x90 160x120 176x144 320x180 320x240 352x288 432x240 640x360 800x448 800x600 "
+    "864x480 960x720 1024x576 1280x720 1600x896 1920x1080 2304x1296 2304x1536",
+    "[video4linux2,v4l2 @ 0x5581cbd0f2c0] Compressed:       mjpeg :          Motion-JPEG : "
+    "640x480 160x90 160x120 176x144 320x180 320x240 352x288 432x240 640x360 800x448 800x600 "
+    "864x480 960x720 1024x576 1280x720 1600x896 1920x1080",
+]
+
+_FORMATS = ("pixel_format=yuyv422", "pixel_format=nv12", "vcodec=mjpeg", "vcodec=h264")
+_FPS = (60, 30, 25, 15, 7.5, 5)
+_RATES = (8000, 11025, 22050, 32000, 44100, 48000, 96000)
+_INFOS = (
+    "(tv, bt470bg/bt709/unknown, topleft)",
+    "(pc, bt470bg/bt709/unknown, center)",
+)
+
+
+def synthetic_video_options(options):
+    lines = []
+    for i in range(options):
+        size = f"{160 + 16 * (i % 240)}x{90 + 9 * (i % 240)}"
+        fps = _FPS[i % len(_FPS)]
+        lines.append(
+            f"  {_FORMATS[(i // 240) % len(_FORMATS)]}  min s={size} fps={fps:g} "
+            f"max s={size} fps={fps:g} {_INFOS[i % 2]}"
+        )
+    return lines
+
+
+def synthetic_audio_options(options):
+    return [
+        f"  ch={1 + i % 2:2d}, bits={(8, 16, 24)[(i // 2) % 3]:2d}, rate={_RATES[(i // 6) % len(_RATES)]:6d}"
+        for i in range(options)
+    ]
+
+
+def synthetic_devices(devices, options):
+    video = [
+        (
+            "video",
+            f"Synthetic Camera {i}",
+            rf"@device_pnp_\\?\usb#vid_{i:04x}&pid_0001&mi_00#{{65e8773d-8f56-11d0-a3b9-00a0c9223196}}\global",
+            synthetic_video_options(options),
+        )
+        for i in range((devices + 1) // 2)
+    ]
+    audio = [
+        (
+            "audio",
+            f"Synthetic Microphone {i}",
+            rf"@device_cm_{{33D9A762-90C8-11D0-BD43-00A0C911CE86}}\wave_{{{i:08X}-0000-0000-0000-000000000000}}",
+            synthetic_audio_options(options),
+        )
+        for i in range(devices // 2)
+    ]
+    return video + audio
+
+
+def configured_devices(environ=None):
+    environ = os.environ if environ is None else environ
+    if environ.get("FAKEFFMPEG_FIXTURE", "recorded") == "synthetic":
+        devices = synthetic_devices(
+            int(environ.get("FAKEFFMPEG_DEVICES", "4")),
+            int(environ.get("FAKEFFMPEG_OPTIONS", "20")),
+        )
+    else:
+        devices = RECORDED_DEVICES
+    plugged = environ.get("FAKEFFMPEG_PLUGGED")
+    if plugged:
+        try:
+            with open(plugged, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+        except OSError:
+            return devices
+        names = {}
+        for line in lines:
+            name, _, new_name = line.partition("=>")
+            names[name.strip()] = new_name.strip() or name.strip()
+        devices = [
+            (device[0], names[device[1]], *device[2:]) for device in devices if device[1] in names
+        ]
+    return devices
+
+
+def banner(version=VERSION):
+    return [
+        f"ffmpeg version {version} Copyright (c) 2000-2023 the FFmpeg developers"
+    ] + BANNER[1:]
+
+
+def _major(version):
+    digits = version.lstrip("n").split(".", 1)[0]
+    return int(digits) if digits.isdigit() else None
+
+
+def render_info(argv, version=VERSION, inputs=tuple(INPUT_DEVICES)):
+    r"""
+    Returns the stdout lines of "-version" and "-devices", None for every other call.
+    """
+    if "-version" in argv:
+        return [line.strip() for line in banner(version)]
+    if "-devices" in argv:
+        lines = ["Devices:", " D. = Demuxing supported", " .E = Muxing supported", " ---"]
+        for name in sorted(inputs):
+            flags, description = INPUT_DEVICES.get(name, ("D ", name))
+            lines.append(f" {flags} {name:<15} {description}")
+        lines.append("  E sdl,sdl2        SDL2 output device")
+        return lines
+    return None
+
+
+def render(argv, devices, version=VERSION):
+    r"""
+    Returns the stderr lines and the exit code ffmpeg would produce for argv.
+    """
+    lines = [] if "-hide_banner" in argv else banner(version)
+    target = argv[argv.index("-i") + 1] if "-i" in argv[:-1] else ""
+    if "-list_devices" in argv:
+        major = _major(version)
+        if major is not None and major < 5:
+            for kind, header in (
+                ("video", "DirectShow video devices (some may be both video and audio devices)"),
+                ("audio", "DirectShow audio devices"),
+            ):
+                lines.append(TAG + header)
+                for devicekind, name, alt_dev, _ in devices:
+                    if devicekind == kind:
+                        lines.append(f'{TAG} "{name}"')
+                        lines.append(f'{TAG}    Alternative name "{alt_dev}"')
+        else:
+            for kind, name, alt_dev, _ in devices:
+                lines.append(f'{TAG}"{name}" ({kind})')
+                lines.append(f'{TAG}  Alternative name "{alt_dev}"')
+        lines.append(f"{target}: Immediate exit requested")
+        return lines, 1
+    if "-list_formats" in argv:
+        if target.startswith("/dev/video"):
+            lines.extend(RECORDED_V4L2_FORMATS)
+            lines.append(f"{target}: Immediate exit requested")
+        else:
+            lines.append(f"{target}: No such file or directory")
+        return lines, 1
+    if "-list_options" in argv:
+        kind, _, alt_dev = target.partition("=")
+        for devicekind, name, devicealt, options in devices:
+            if devicekind == kind and alt_dev in (name, devicealt):
+                lines.append(
+                    f"{TAG}DirectShow {kind} device options (from {kind} devices)"
+                )
+                lines.append(f'{TAG} Pin "Capture" (alternative pin name "0")')
+                lines.extend(TAG + line for line in options)
+                lines.append(f"{target}: Immediate exit requested")
+                return lines, 1
+        lines.append(
+            f"{TAG}Could not find {kind} only device with name [{alt_dev}] among source devices of type {kind}."
+        )
+        lines.append(f"{target}: I/O error")
+        return lines, 1
+    lines.append("Unrecognized option or missing input")
+    return lines, 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    latency = float(os.environ.get("FAKEFFMPEG_LATENCY", "0"))
+    if latency > 0:
+        time.sleep(latency)
+    version = os.environ.get("FAKEFFMPEG_VERSION", VERSION)
+    info = render_info(
+        argv, version, os.environ.get("FAKEFFMPEG_INPUTS", ",".join(INPUT_DEVICES)).split(",")
+    )
+    if info is not None:
+        if "-hide_banner" not in argv and "-version" not in argv:
+            sys.stderr.write("\n".join(banner(version)) + "\n")
+        sys.stdout.write("\n".join(info) + "\n")
+        return 0
+    lines, returncode = render(argv, configured_devices(), version)
+    out = sys.stderr.buffer
+    hang = os.environ.get("FAKEFFMPEG_HANG")
+    if hang and any(hang in arg for arg in argv):
+        for line in banner(version):
+            out.write(line.encode("utf-8") + b"\r\n")
+        out.flush()
+        time.sleep(3600)
+    for line in lines:
+        out.write(line.encode("utf-8") + b"\r\n")
+    out.flush()
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+r"""
+The repository folder is the ffmpegdevices package, it is loaded under that name here.
+fake_ffmpeg is an executable fakeffmpeg.py launcher in a fresh folder, the FAKEFFMPEG_*
+variables of the environment are cleared, set them with monkeypatch before the first call.
+"""
+
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+if "ffmpegdevices" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        "ffmpegdevices", os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+    )
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["ffmpegdevices"] = _module
+    _spec.loader.exec_module(_module)
+
+from ffmpegdevices.benchmark import make_fake_ffmpeg  # noqa: E402
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    if os.name == "nt":
+        pytest.skip("the fake ffmpeg launcher is a shell script")
+    for name in list(os.environ):
+        if name.startswith("FAKEFFMPEG_"):
+            monkeypatch.delenv(name)
+    folder = tmp_path / "bin"
+    folder.mkdir()
+    return make_fake_ffmpeg(str(folder))
+
+
+def probe_count(stats, option="-list_options"):
+    return sum(option in trace.argv for trace in stats.traces)
+
+
+def max_overlap(stats, option="-list_options"):
+    # the most calls of one kind that ran at the same time, from the traces
+    spans = [
+        (trace.started, trace.started + trace.latency)
+        for trace in stats.traces
+        if option in trace.argv
+    ]
+    return max(
+        (sum(start <= at < end for start, end in spans) for at, _ in spans), default=0
+    )
+
+
+def fake_processes():
+    # fake ffmpeg processes that are still alive, empty without pgrep
+    try:
+        found = subprocess.run(
+            ["pgrep", "-f", f"^{re.escape(sys.executable)} \\S*fakeffmpeg\\.py( |$)"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except OSError:
+        return []
+    return found.stdout.split()
+
+
+def without_timing(devices):
+    return {
+        kind: {i: {k: v for k, v in d.items() if k != "elapsed"} for i, d in items.items()}
+        for kind, items in devices.items()
+    }
+
+
+def scripted_ffmpeg(folder, outputs):
+    r"""
+    Writes an ffmpeg stand-in that prints outputs[option] to stderr for the first option of
+    outputs found in its arguments, e.g. {"-list_devices": [...], "-list_options": [...]}.
+    "-version" and "-devices" describe a 6.0 build with dshow.
+    """
+    path = os.path.join(str(folder), "scripted-ffmpeg")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"OUTPUTS = {outputs!r}\n"
+            "argv = sys.argv[1:]\n"
+            "if '-version' in argv:\n"
+            "    print('ffmpeg version 6.0 Copyright (c) 2000-2023 the FFmpeg developers')\n"
+            "    sys.exit(0)\n"
+            "if '-devices' in argv:\n"
+            "    print(' D  dshow           DirectShow capture')\n"
+            "    sys.exit(0)\n"
+            "for option, lines in OUTPUTS.items():\n"
+            "    if option in argv:\n"
+            "        sys.stderr.write(''.join(line + '\\n' for line in lines))\n"
+            "        break\n"
+            "sys.exit(1)\n"
+        )
+    os.chmod(path, 0o755)
+    return path
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import fake_processes, max_overlap, probe_count, without_timing
+from ffmpegdevices import EnumerationStats, get_all_devices, get_all_devices_async
+
+
+def test_matches_sync(fake_ffmpeg):
+    sync = get_all_devices(fake_ffmpeg, backend="dshow")
+    result = asyncio.run(get_all_devices_async(fake_ffmpeg, max_workers=4, backend="dshow"))
+    assert without_timing(result) == without_timing(sync)
+    assert [list(items) for items in result.values()] == [list(items) for items in sync.values()]
+
+
+def test_compact_matches_sync(fake_ffmpeg):
+    sync = get_all_devices(fake_ffmpeg, compact=True, backend="dshow")
+    result = asyncio.run(get_all_devices_async(fake_ffmpeg, compact=True, backend="dshow"))
+    assert without_timing(result) == without_timing(sync)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_at_most_max_workers_probes(fake_ffmpeg, monkeypatch, max_workers):
+    monkeypatch.setenv("FAKEFFMPEG_LATENCY", "0.2")
+    stats = EnumerationStats()
+    asyncio.run(
+        get_all_devices_async(
+            fake_ffmpeg, max_workers=max_workers, backend="dshow", stats=stats
+        )
+    )
+    assert probe_count(stats) == 5
+    assert max_overlap(stats) == max_workers
+
+
+def test_cancel_kills_running_option_probes(fake_ffmpeg, monkeypatch):
+    # every video probe hangs, "-list_devices" and the audio probes answer
+    monkeypatch.setenv("FAKEFFMPEG_HANG", "video=")
+    stats = EnumerationStats()
+
+    async def cancel():
+        task = asyncio.ensure_future(
+            get_all_devices_async(fake_ffmpeg, max_workers=2, backend="dshow", stats=stats)
+        )
+        while probe_count(stats, "-list_devices") == 0:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    started = time.perf_counter()
+    asyncio.run(cancel())
+    assert time.perf_counter() - started < 10
+    # a trace is recorded once its ffmpeg was killed and reaped
+    traces = [trace for trace in stats.traces if "-list_options" in trace.argv]
+    assert len(traces) == 2
+    assert all(trace.latency < 10 for trace in traces)
+    assert fake_processes() == []
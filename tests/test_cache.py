@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+
+from conftest import probe_count, without_timing
+from ffmpegdevices import EnumerationStats, clear_device_cache, get_all_devices
+from ffmpegdevices import _read_cache, _write_cache
+
+
+def _entries(cache_dir):
+    # the inventory entries, without the capabilities of the executable
+    return sorted(
+        f
+        for f in os.listdir(cache_dir)
+        if f.startswith("ffmpegdevices-") and not f.endswith("-capabilities.json")
+    )
+
+
+def test_hit_skips_option_probes(fake_ffmpeg, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first, second = EnumerationStats(), EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=first)
+    cached = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=second)
+    assert cached == devices
+    assert probe_count(first) == 5
+    assert probe_count(second) == 0
+    assert len(_entries(cache_dir)) == 1
+
+
+def test_ttl_expiry(fake_ffmpeg, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow")
+    path = os.path.join(cache_dir, _entries(cache_dir)[0])
+    assert _read_cache(path, 60) is not None
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created"] -= 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    assert _read_cache(path, 60) is None
+    assert _read_cache(path, None) is not None
+    stats = EnumerationStats()
+    get_all_devices(fake_ffmpeg, cache_dir=cache_dir, cache_ttl=60, backend="dshow", stats=stats)
+    assert probe_count(stats) == 5
+
+
+def test_new_device_list_replaces_entry(fake_ffmpeg, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    plugged = tmp_path / "plugged.txt"
+    monkeypatch.setenv("FAKEFFMPEG_PLUGGED", str(plugged))
+    plugged.write_text("HD Pro Webcam C920\nLogi Capture\n", encoding="utf-8")
+    get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow")
+    before = _entries(cache_dir)
+    plugged.write_text("HD Pro Webcam C920\n", encoding="utf-8")
+    stats = EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=stats)
+    assert probe_count(stats) == 1
+    assert [d["name"] for d in devices["video"].values()] == ["HD Pro Webcam C920"]
+    after = _entries(cache_dir)
+    assert len(after) == 1 and after != before
+
+
+def test_changed_executable_invalidates(fake_ffmpeg, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow")
+    st = os.stat(fake_ffmpeg)
+    os.utime(fake_ffmpeg, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    stats = EnumerationStats()
+    get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=stats)
+    assert probe_count(stats) == 5
+
+
+def test_clear_keeps_foreign_files(fake_ffmpeg, tmp_path):
+    cache_dir = tmp_path / "cache"
+    get_all_devices(fake_ffmpeg, cache_dir=str(cache_dir), backend="dshow")
+    (cache_dir / "settings.json").write_text("{}", encoding="utf-8")
+    assert clear_device_cache(str(cache_dir), "/some/other/ffmpeg") == 0
+    # the inventory and the capabilities of the executable
+    assert clear_device_cache(str(cache_dir), fake_ffmpeg) == 2
+    assert clear_device_cache(str(cache_dir)) == 0
+    assert os.listdir(cache_dir) == ["settings.json"]
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / "ffmpegdevices-0123456789abcdef-0123456789abcdef.json")
+    payloads = [
+        {"video": {i: {"name": str(i) * 1000, "options": {j: {"fps": j} for j in range(50)}}}}
+        for i in range(8)
+    ]
+    stop = threading.Event()
+    seen = []
+
+    def read():
+        while not stop.is_set():
+            seen.append(_read_cache(path, None))
+
+    def write(payload):
+        for _ in range(20):
+            _write_cache(path, payload)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(payload,)) for payload in payloads]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+    assert all(entry is None or entry in payloads for entry in seen)
+    assert _read_cache(path, None) in payloads
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_concurrent_enumerations(fake_ffmpeg, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow")
+            )
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert all(without_timing(r) == without_timing(results[0]) for r in results)
+    assert len(_entries(cache_dir)) == 1
+    cached = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow")
+    assert without_timing(cached) == without_timing(results[0])
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+import ffmpegdevices
+from conftest import probe_count
+from ffmpegdevices import EnumerationStats, get_all_devices, get_all_devices_async
+from ffmpegdevices import get_capabilities
+
+
+def test_calls_are_traced(fake_ffmpeg):
+    stats = EnumerationStats()
+    capabilities = get_capabilities(fake_ffmpeg, stats=stats)
+    assert {"dshow", "v4l2"} <= capabilities.input_devices
+    assert probe_count(stats, "-version") == 1 and probe_count(stats, "-devices") == 1
+    assert all(trace.stderr_bytes > 0 for trace in stats.traces)
+    assert get_capabilities(fake_ffmpeg, stats=stats) is capabilities
+    assert len(stats.traces) == 2
+
+
+def test_cache_hit_in_a_new_process(fake_ffmpeg, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    first = EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=first)
+    assert probe_count(first, "-version") == 1 and probe_count(first, "-devices") == 1
+    # a new process starts without the memo of get_capabilities
+    monkeypatch.setattr(ffmpegdevices, "_CAPABILITIES", {})
+    second = EnumerationStats()
+    cached = get_all_devices(fake_ffmpeg, cache_dir=cache_dir, backend="dshow", stats=second)
+    assert cached == devices
+    # one ffmpeg call instead of three
+    assert len(second.traces) == 1 and probe_count(second, "-list_devices") == 1
+    assert get_capabilities(fake_ffmpeg, cache_dir=cache_dir) == get_capabilities(fake_ffmpeg)
+
+
+def test_async_cancel_kills_the_version_call(fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKEFFMPEG_LATENCY", "30")
+    stats = EnumerationStats()
+
+    async def cancel():
+        task = asyncio.ensure_future(
+            get_all_devices_async(fake_ffmpeg, backend="dshow", stats=stats)
+        )
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    # the trace is recorded after ffmpeg was killed and reaped
+    assert [trace.argv[-1] for trace in stats.traces] == ["-version"]
+    assert stats.traces[0].latency < 10
@@ -0,0 +1,31 @@
+import json
+import signal
+
+import pytest
+
+from ffmpegdevices.__main__ import main
+
+
+@pytest.mark.parametrize("extra", [[], ["--daemon", "--socket", "/nonexistent/inventory.sock"]])
+def test_missing_executable(capsys, extra):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["/nonexistent/ffmpeg", *extra])
+    assert exit_info.value.code == 1
+    assert "ffmpeg executable not found" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("extra", [[], ["--serve"]])
+def test_missing_input_device(fake_ffmpeg, capsys, monkeypatch, extra):
+    monkeypatch.setenv("FAKEFFMPEG_INPUTS", "lavfi")
+    # --serve installs a SIGTERM handler, keep the one of the test process
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    with pytest.raises(SystemExit) as exit_info:
+        main([fake_ffmpeg, "--backend", "dshow", *extra])
+    assert exit_info.value.code == 1
+    assert "has no dshow input device" in capsys.readouterr().err
+
+
+def test_prints_the_inventory(fake_ffmpeg, capsys):
+    assert main([fake_ffmpeg, "--backend", "dshow"]) == 0
+    devices = json.loads(capsys.readouterr().out)
+    assert len(devices["video"]) == 3 and len(devices["audio"]) == 2
@@ -0,0 +1,63 @@
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT, probe_count
+from ffmpegdevices import DeviceWatcher, EnumerationStats, get_all_devices
+from ffmpegdevices.daemon import InventoryServer, get_all_devices_from_daemon
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets"
+)
+
+
+def test_serves_the_inventory(fake_ffmpeg, tmp_path):
+    socket_path = str(tmp_path / "inventory.sock")
+    server = InventoryServer(fake_ffmpeg, socket_path, backend="dshow", min_interval=60)
+    server.start()
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        devices = get_all_devices_from_daemon(fake_ffmpeg, socket_path, backend="dshow")
+        assert devices == server.watcher.devices
+        assert len(devices["video"]) == 3 and len(devices["audio"]) == 2
+        with pytest.raises(OSError, match="already listening"):
+            InventoryServer(fake_ffmpeg, socket_path, backend="dshow").start()
+    finally:
+        server.stop()
+    assert not os.path.exists(socket_path)
+
+
+def test_falls_back_without_a_server(fake_ffmpeg, tmp_path):
+    socket_path = str(tmp_path / "missing.sock")
+    devices = get_all_devices_from_daemon(fake_ffmpeg, socket_path, backend="dshow")
+    assert devices["video"][0]["name"] == get_all_devices(fake_ffmpeg, backend="dshow")[
+        "video"
+    ][0]["name"]
+
+
+def test_start_after_poll_waits_one_interval(fake_ffmpeg):
+    stats = EnumerationStats()
+    watcher = DeviceWatcher(
+        fake_ffmpeg, callback=lambda event: None, min_interval=60, backend="dshow", stats=stats
+    )
+    watcher.poll()
+    watcher.start()
+    time.sleep(0.5)
+    watcher.stop()
+    assert probe_count(stats, "-list_devices") == 1
+
+
+def test_import_does_not_load_the_daemon(tmp_path):
+    os.symlink(ROOT, tmp_path / "ffmpegdevices")
+    code = (
+        "import sys, ffmpegdevices\n"
+        "assert 'socketserver' not in sys.modules and 'ffmpegdevices.daemon' not in sys.modules\n"
+        "ffmpegdevices.InventoryServer\n"
+        "assert 'ffmpegdevices.daemon' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=str(tmp_path), check=True)
@@ -0,0 +1,19 @@
+from conftest import without_timing
+from ffmpegdevices import get_all_devices
+
+
+def test_concurrent_probes_match_sequential(fake_ffmpeg, monkeypatch):
+    # probes of equal latency finish in any order, the result must not depend on it
+    monkeypatch.setenv("FAKEFFMPEG_LATENCY", "0.05")
+    sequential = get_all_devices(fake_ffmpeg, backend="dshow")
+    concurrent = get_all_devices(fake_ffmpeg, max_workers=4, backend="dshow")
+    assert without_timing(concurrent) == without_timing(sequential)
+    for kind in ("video", "audio"):
+        assert list(concurrent[kind]) == list(sequential[kind])
+        assert [d["name"] for d in concurrent[kind].values()] == [
+            d["name"] for d in sequential[kind].values()
+        ]
+        assert [list(d["options"]) for d in concurrent[kind].values()] == [
+            list(d["options"]) for d in sequential[kind].values()
+        ]
+    assert list(concurrent) == list(sequential)
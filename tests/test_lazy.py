@@ -0,0 +1,77 @@
+import json
+import pickle
+import pprint
+
+from conftest import probe_count, without_timing
+from ffmpegdevices import EnumerationStats, LazyDevice, LazyOptions, get_all_devices, json_default
+
+
+def test_probes_on_first_access(fake_ffmpeg):
+    stats = EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, lazy=True, backend="dshow", stats=stats)
+    eager = get_all_devices(fake_ffmpeg, backend="dshow")
+    options = devices["video"][0]["options"]
+    assert isinstance(options, LazyOptions) and not options.loaded
+    assert probe_count(stats) == 0
+    assert options == eager["video"][0]["options"]
+    assert len(options) == 36 and options[0]["max_s"] == "640x480"
+    assert options.loaded and probe_count(stats) == 1
+
+
+def test_json_and_pickle_match_eager(fake_ffmpeg):
+    devices = get_all_devices(fake_ffmpeg, lazy=True, backend="dshow")
+    eager = get_all_devices(fake_ffmpeg, backend="dshow")
+    options = devices["audio"][0]["options"]
+    assert json.loads(json.dumps(options, default=json_default)) == json.loads(
+        json.dumps(eager["audio"][0]["options"])
+    )
+    assert pickle.loads(pickle.dumps(options)) == eager["audio"][0]["options"]
+    assert type(pickle.loads(pickle.dumps(options))) is dict
+
+
+def test_device_record_loads_before_it_is_shown(fake_ffmpeg):
+    stats = EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, lazy=True, backend="dshow", stats=stats)
+    eager = get_all_devices(fake_ffmpeg, backend="dshow")
+    device = devices["audio"][1]
+    assert isinstance(device, LazyDevice)
+    assert device["name"] == eager["audio"][1]["name"] and not device.loaded
+    assert device["status"] == "ok" and device.loaded
+    assert probe_count(stats) == 1
+    # every device is written complete, never a "pending" status next to loaded options
+    dumped = json.loads(json.dumps(devices))
+    assert without_timing(dumped) == without_timing(json.loads(json.dumps(eager)))
+    assert probe_count(stats) == 5
+    copy = pickle.loads(pickle.dumps(devices["video"][0]))
+    assert type(copy) is dict
+    assert copy == dict(eager["video"][0], elapsed=copy["elapsed"])
+
+
+def test_clear_before_load_stays_empty():
+    calls = []
+    options = LazyOptions(lambda: calls.append(1) or {0: {"rate": 44100}})
+    options.clear()
+    assert len(options) == 0 and dict(options) == {}
+    assert calls == [1]
+
+
+def test_mutation():
+    options = LazyOptions(lambda: {0: {"rate": 44100}})
+    options[1] = {"rate": 48000}
+    del options[0]
+    assert dict(options) == {1: {"rate": 48000}}
+    assert list(options.keys()) == [1] and 1 in options
+
+
+def test_pprint_and_json_like_a_dict(fake_ffmpeg):
+    stats = EnumerationStats()
+    devices = get_all_devices(fake_ffmpeg, lazy=True, backend="dshow", stats=stats)
+    text = pprint.pformat(devices)
+    assert probe_count(stats) == 5
+    plain = {kind: {i: dict(d) for i, d in items.items()} for kind, items in devices.items()}
+    assert text == pprint.pformat(plain)
+    assert "'status': 'ok'" in text and "\n" in text
+    assert json.dumps(devices, indent=1) == json.dumps(plain, indent=1)
+    device = devices["video"][0]
+    assert isinstance(device, dict) and device == plain["video"][0]
+    assert dict(device["options"]) == device.copy()["options"]
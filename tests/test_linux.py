@@ -0,0 +1,56 @@
+import os
+
+from conftest import FIXTURES
+from ffmpegdevices import LinuxBackend, ModeResolver, get_all_devices
+
+
+def _backend():
+    root = os.path.join(FIXTURES, "linux")
+    return LinuxBackend(os.path.join(root, "sys"), os.path.join(root, "proc"))
+
+
+def test_listing(fake_ffmpeg):
+    devices = get_all_devices(fake_ffmpeg, backend=_backend())
+    assert [(d["name"], d["alternative_name"]) for d in devices["video"].values()] == [
+        ("HD Pro Webcam C920", "/dev/video0"),
+        ("OBS Virtual Camera", "/dev/video2"),
+    ]
+    assert [d["name"] for d in devices["audio"].values()] == [
+        "HDA Intel PCH: ALC3246 Analog",
+        "HD Pro Webcam C920: USB Audio",
+    ]
+    assert all(d["status"] == "ok" for d in devices["video"].values())
+
+
+def test_video_args_with_unknown_frame_rate(fake_ffmpeg):
+    devices = get_all_devices(fake_ffmpeg, backend=_backend(), compact=True)
+    camera = devices["video"][0]
+    assert camera["options"] and all(o.fps == 0 for o in camera["options"])
+    assert ModeResolver(camera).video_args(1280, 720, 30, prefer=("mjpeg",)) == [
+        "-f",
+        "v4l2",
+        "-video_size",
+        "1280x720",
+        "-framerate",
+        "30",
+        "-input_format",
+        "mjpeg",
+        "-i",
+        "/dev/video0",
+    ]
+
+
+def test_audio_args(fake_ffmpeg):
+    devices = get_all_devices(fake_ffmpeg, backend=_backend())
+    microphone = devices["audio"][1]
+    assert microphone["alternative_name"] == "hw:1,0"
+    assert ModeResolver(microphone).audio_args(min_rate=44100, channels=2) == [
+        "-f",
+        "alsa",
+        "-sample_rate",
+        "48000",
+        "-channels",
+        "2",
+        "-i",
+        "hw:1,0",
+    ]
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from conftest import scripted_ffmpeg
+from ffmpegdevices import VideoOption, get_all_devices
+from ffmpegdevices import _DeviceListParser, _LegacyDeviceListParser, _VideoOptionsParser
+
+TAG = "[dshow @ 0000020a7f4c3b40] "
+
+DEVICES = [
+    "ffmpeg version 6.0 Copyright (c) 2000-2023 the FFmpeg developers",
+    "  configuration: --enable-gpl",
+    f'{TAG}"Cam" (video)',
+    f'{TAG}  Alternative name "@device_pnp_cam"',
+    f'{TAG}"Mic" (audio)',
+    f'{TAG}  Alternative name "@device_cm_mic"',
+    "dummy: Immediate exit requested",
+]
+
+# the ffmpeg CLI folds repeated log lines, the fold line has no "[dshow @ ...]" prefix
+FOLDED_OPTIONS = [
+    f"{TAG}DirectShow video device options (from video devices)",
+    f'{TAG} Pin "Capture" (alternative pin name "0")',
+    f"{TAG}  vcodec=mjpeg  min s=640x480 fps=30 max s=640x480 fps=30",
+    "    Last message repeated 1 times",
+    f"{TAG}  vcodec=mjpeg  min s=1280x720 fps=30 max s=1280x720 fps=30",
+    f"{TAG}  vcodec=mjpeg  min s=1920x1080 fps=30 max s=1920x1080 fps=30",
+    "video=@device_pnp_cam: Immediate exit requested",
+]
+
+
+def _feed(parser, lines):
+    records = []
+    for line in lines:
+        record = parser.feed(line.encode("utf-8"))
+        if record is not None:
+            records.append(record)
+        if parser.done:
+            break
+    return records
+
+
+def test_device_list():
+    assert _feed(_DeviceListParser(), DEVICES) == [
+        ("video", "Cam", "@device_pnp_cam"),
+        ("audio", "Mic", "@device_cm_mic"),
+    ]
+
+
+def test_legacy_device_list():
+    lines = [
+        f"{TAG}DirectShow video devices (some may be both video and audio devices)",
+        f'{TAG} "Cam"',
+        f'{TAG}    Alternative name "@device_pnp_cam"',
+        f"{TAG}DirectShow audio devices",
+        f'{TAG} "Microphone (USB Audio)"',
+        f'{TAG}    Alternative name "@device_cm_mic"',
+        "dummy: Immediate exit requested",
+    ]
+    assert _feed(_LegacyDeviceListParser(), lines) == [
+        ("video", "Cam", "@device_pnp_cam"),
+        ("audio", "Microphone (USB Audio)", "@device_cm_mic"),
+    ]
+
+
+def test_folded_repeat_line_does_not_end_the_listing():
+    parser = _VideoOptionsParser()
+    options = _feed(parser, FOLDED_OPTIONS)
+    assert [(o.vcodec, o.max_width) for o in options] == [
+        ("mjpeg", 640),
+        ("mjpeg", 1280),
+        ("mjpeg", 1920),
+    ]
+    assert parser.done
+
+
+@pytest.mark.parametrize(
+    "end",
+    [
+        "video=@device_pnp_cam: Immediate exit requested",
+        "video=@device_pnp_cam: I/O error",
+        "Error opening input file video=@device_pnp_cam.",
+    ],
+)
+def test_end_of_input(end):
+    parser = _VideoOptionsParser()
+    lines = FOLDED_OPTIONS[:3] + [end, f"{TAG}  vcodec=mjpeg  min s=1x1 fps=1 max s=1x1 fps=1"]
+    assert len(_feed(parser, lines)) == 1
+    assert parser.done
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the scripted ffmpeg needs a shebang")
+def test_folded_repeat_line_end_to_end(tmp_path):
+    exe = scripted_ffmpeg(
+        tmp_path, {"-list_devices": DEVICES, "-list_options": FOLDED_OPTIONS}
+    )
+    devices = get_all_devices(exe, backend="dshow", compact=True)
+    options = devices["video"][0]["options"]
+    assert devices["video"][0]["status"] == "ok"
+    assert [o.max_width for o in options] == [640, 1280, 1920]
+    assert all(isinstance(o, VideoOption) for o in options)
@@ -0,0 +1,59 @@
+import pytest
+
+from ffmpegdevices import AudioOption, ModeResolver, VideoOption, VideoOptionTable
+
+
+def _device(*options):
+    return {
+        "name": "Cam",
+        "alternative_name": "@device_pnp_cam",
+        "options": {i: o.to_dict() for i, o in enumerate(options)},
+    }
+
+
+FIXED_720 = VideoOption(None, "mjpeg", 1280, 720, 1280, 720, 30, 30, None)
+FIXED_1080 = VideoOption(None, "mjpeg", 1920, 1080, 1920, 1080, 30, 30, None)
+RANGE = VideoOption("yuyv422", None, 160, 120, 1920, 1080, 5, 30, None)
+
+
+def _arg(args, name):
+    return args[args.index(name) + 1]
+
+
+def test_smallest_and_largest():
+    resolver = ModeResolver(_device(FIXED_1080, FIXED_720))
+    assert resolver.best_video(1280, 720) == FIXED_720
+    assert resolver.best_video(1280, 720, policy="largest") == FIXED_1080
+    assert resolver.best_video(2560, 1440) is None
+
+
+@pytest.mark.parametrize("method", ["best_video", "best_audio", "video_args"])
+def test_unknown_policy(method):
+    resolver = ModeResolver(_device(FIXED_720, AudioOption(2, 16, 44100)))
+    with pytest.raises(ValueError, match="policy"):
+        getattr(resolver, method)(policy="biggest")
+
+
+def test_range_mode_is_clamped_to_the_request():
+    resolver = ModeResolver(_device(RANGE))
+    args = resolver.video_args(1280, 720, 15)
+    assert _arg(args, "-video_size") == "1280x720"
+    assert _arg(args, "-framerate") == "30"  # the dict format keeps only the max frame rate
+    args = resolver.video_args(100, 100)
+    assert _arg(args, "-video_size") == "160x120"
+    args = resolver.video_args(1280, 720, policy="largest")
+    assert _arg(args, "-video_size") == "1920x1080"
+
+
+def test_fixed_mode_uses_its_size():
+    args = ModeResolver(_device(FIXED_1080)).video_args(1280, 720)
+    assert _arg(args, "-video_size") == "1920x1080"
+    assert args[-1] == "video=@device_pnp_cam"
+
+
+def test_frame_rate_range_of_compact_options():
+    device = dict(_device(), options=VideoOptionTable([RANGE]))
+    resolver = ModeResolver(device)
+    assert _arg(resolver.video_args(1280, 720, 15), "-framerate") == "15"
+    assert _arg(resolver.video_args(1280, 720), "-framerate") == "30"
+    assert _arg(resolver.input_args(RANGE, 1280, 720, 60), "-framerate") == "30"
@@ -0,0 +1,35 @@
+import asyncio
+
+from conftest import probe_count, without_timing
+from ffmpegdevices import EnumerationStats, get_all_devices, get_all_devices_async
+
+
+def _broken_hook(trace):
+    raise RuntimeError("metrics backend is down")
+
+
+def test_totals(fake_ffmpeg):
+    seen = []
+    stats = EnumerationStats(hook=seen.append)
+    get_all_devices(fake_ffmpeg, max_workers=4, backend="dshow", stats=stats)
+    totals = stats.totals()
+    assert totals["calls"] == len(stats.traces) == len(seen) == 8
+    assert probe_count(stats) == 5
+    assert totals["stderr_bytes"] == sum(t.stderr_bytes for t in stats.traces) > 0
+    assert 0 < totals["wall"] <= totals["latency"]
+    stats.reset()
+    assert stats.totals()["calls"] == 0
+
+
+def test_broken_hook_does_not_change_the_result(fake_ffmpeg):
+    expected = get_all_devices(fake_ffmpeg, backend="dshow")
+    stats = EnumerationStats(hook=_broken_hook)
+    devices = get_all_devices(fake_ffmpeg, backend="dshow", stats=stats)
+    assert without_timing(devices) == without_timing(expected)
+    assert all(d["status"] == "ok" for items in devices.values() for d in items.values())
+    assert len(stats.hook_errors) == len(stats.traces) == 6
+    assert all(isinstance(e, RuntimeError) for _, e in stats.hook_errors)
+    stats = EnumerationStats(hook=_broken_hook)
+    devices = asyncio.run(get_all_devices_async(fake_ffmpeg, backend="dshow", stats=stats))
+    assert without_timing(devices) == without_timing(expected)
+    assert len(stats.hook_errors) == 6
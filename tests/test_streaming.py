@@ -0,0 +1,84 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT, fake_processes, without_timing
+from ffmpegdevices import get_all_devices, iter_devices, iter_devices_async
+
+
+@pytest.fixture
+def hung_webcam(monkeypatch):
+    # only the "-list_options" call of the C920, the first device probed, hangs
+    monkeypatch.setenv("FAKEFFMPEG_HANG", "vid_046d")
+
+
+def _collect(streamed):
+    devices = {"video": {}, "audio": {}}
+    for kind, index, device in streamed:
+        devices[kind][index] = device
+    return devices
+
+
+async def _stream_async(*args, **kwargs):
+    return [item async for item in iter_devices_async(*args, **kwargs)]
+
+
+def test_iter_devices_matches_get_all_devices(fake_ffmpeg):
+    expected = without_timing(get_all_devices(fake_ffmpeg, backend="dshow"))
+    streamed = list(iter_devices(fake_ffmpeg, max_workers=4, backend="dshow"))
+    assert len(streamed) == 5
+    assert without_timing(_collect(streamed)) == expected
+    streamed = asyncio.run(_stream_async(fake_ffmpeg, max_workers=4, backend="dshow"))
+    assert without_timing(_collect(streamed)) == expected
+
+
+def test_iter_devices_yields_in_completion_order(fake_ffmpeg, hung_webcam):
+    streamed = list(iter_devices(fake_ffmpeg, max_workers=4, backend="dshow", timeout=1))
+    assert [(kind, index) for kind, index, _ in streamed][-1] == ("video", 0)
+    assert streamed[-1][2]["status"] == "timed_out"
+    streamed = asyncio.run(
+        _stream_async(fake_ffmpeg, max_workers=4, backend="dshow", timeout=1)
+    )
+    assert [(kind, index) for kind, index, _ in streamed][-1] == ("video", 0)
+
+
+def test_early_stop_kills_the_running_probes(fake_ffmpeg, hung_webcam):
+    start = time.perf_counter()
+    for kind, index, device in iter_devices(fake_ffmpeg, max_workers=4, backend="dshow"):
+        assert (kind, index) != ("video", 0) and device["status"] == "ok"
+        break
+    assert time.perf_counter() - start < 5
+    assert fake_processes() == []
+
+
+def test_early_stop_async_kills_the_running_probes(fake_ffmpeg, hung_webcam):
+    async def first():
+        stream = iter_devices_async(fake_ffmpeg, max_workers=4, backend="dshow")
+        try:
+            async for item in stream:
+                return item
+        finally:
+            await stream.aclose()
+
+    start = time.perf_counter()
+    kind, index, device = asyncio.run(first())
+    assert (kind, index) != ("video", 0) and device["status"] == "ok"
+    assert time.perf_counter() - start < 5
+    assert fake_processes() == []
+
+
+def test_interpreter_exits_after_an_early_stop(fake_ffmpeg, hung_webcam, tmp_path):
+    os.symlink(ROOT, tmp_path / "ffmpegdevices")
+    code = (
+        "import sys, ffmpegdevices\n"
+        "for item in ffmpegdevices.iter_devices(sys.argv[1], 4, backend='dshow'):\n"
+        "    break\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", code, fake_ffmpeg], cwd=str(tmp_path), check=True, timeout=10
+    )
+    assert fake_processes() == []
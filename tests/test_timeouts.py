@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from conftest import fake_processes
+from ffmpegdevices import get_all_devices, get_all_devices_async
+
+KRISP = "Krisp Microphone (Krisp Audio)"
+
+
+@pytest.fixture
+def hung_microphone(monkeypatch):
+    # only the "-list_options" call of the Krisp microphone hangs
+    monkeypatch.setenv("FAKEFFMPEG_HANG", "70C2267E")
+
+
+def _check(devices, elapsed, budget):
+    statuses = {d["name"]: d for items in devices.values() for d in items.values()}
+    hung = statuses.pop(KRISP)
+    assert hung["status"] == "timed_out" and hung["error"] and hung["options"] == {}
+    assert len(statuses) == 4
+    assert all(d["status"] == "ok" and "error" not in d for d in statuses.values())
+    assert budget <= elapsed < budget + 2
+    assert fake_processes() == []
+
+
+def _cache_files(cache_dir):
+    if not os.path.isdir(cache_dir):
+        return []
+    return [f for f in os.listdir(cache_dir) if not f.endswith("-capabilities.json")]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_timeout(fake_ffmpeg, hung_microphone, tmp_path, max_workers):
+    cache_dir = str(tmp_path / "cache")
+    start = time.perf_counter()
+    devices = get_all_devices(
+        fake_ffmpeg, max_workers, cache_dir, backend="dshow", timeout=1
+    )
+    _check(devices, time.perf_counter() - start, 1)
+    assert _cache_files(cache_dir) == []
+
+
+def test_deadline(fake_ffmpeg, hung_microphone, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    start = time.perf_counter()
+    devices = get_all_devices(fake_ffmpeg, 4, cache_dir, backend="dshow", deadline=1)
+    _check(devices, time.perf_counter() - start, 1)
+    assert _cache_files(cache_dir) == []
+
+
+@pytest.mark.parametrize("limit", [{"timeout": 1}, {"deadline": 1}])
+def test_async(fake_ffmpeg, hung_microphone, tmp_path, limit):
+    cache_dir = str(tmp_path / "cache")
+    start = time.perf_counter()
+    devices = asyncio.run(
+        get_all_devices_async(fake_ffmpeg, 4, cache_dir, backend="dshow", **limit)
+    )
+    _check(devices, time.perf_counter() - start, 1)
+    assert _cache_files(cache_dir) == []
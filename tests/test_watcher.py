@@ -0,0 +1,85 @@
+import threading
+import time
+
+from conftest import probe_count
+from ffmpegdevices import DeviceWatcher, EnumerationStats
+
+C920 = "HD Pro Webcam C920"
+OBS = "OBS Virtual Camera"
+KRISP = "Krisp Microphone (Krisp Audio)"
+
+
+def _plug(path, *names):
+    path.write_text("\n".join(names) + "\n", encoding="utf-8")
+
+
+def _events(events):
+    return sorted((e.type, e.kind, e.device["name"]) for e in events)
+
+
+def test_events_interval_and_probes(fake_ffmpeg, tmp_path, monkeypatch):
+    plugged = tmp_path / "plugged.txt"
+    monkeypatch.setenv("FAKEFFMPEG_PLUGGED", str(plugged))
+    _plug(plugged, C920, KRISP)
+    stats = EnumerationStats()
+    watcher = DeviceWatcher(
+        fake_ffmpeg, min_interval=1, max_interval=4, backend="dshow", stats=stats
+    )
+
+    assert _events(watcher.poll()) == [("added", "audio", KRISP), ("added", "video", C920)]
+    assert watcher.interval == 1
+    assert probe_count(stats) == 2
+
+    intervals = []
+    for _ in range(3):
+        assert watcher.poll() == []
+        intervals.append(watcher.interval)
+    assert intervals == [2, 4, 4]
+
+    _plug(plugged, C920, KRISP, OBS)
+    assert _events(watcher.poll()) == [("added", "video", OBS)]
+    assert watcher.interval == 1
+    assert probe_count(stats) == 3
+
+    assert watcher.poll() == []
+    assert watcher.interval == 2
+
+    _plug(plugged, C920, OBS)
+    events = watcher.poll()
+    assert _events(events) == [("removed", "audio", KRISP)]
+    assert events[0].device["options"]
+    assert watcher.interval == 1
+
+    _plug(plugged, f"{C920}=>HD Webcam", OBS)
+    events = watcher.poll()
+    assert _events(events) == [("changed", "video", "HD Webcam")]
+    assert events[0].device["options"]
+    assert [d["name"] for d in watcher.devices["video"].values()] == ["HD Webcam", OBS]
+    assert not watcher.devices.get("audio")
+
+    # only the added devices were probed, every poll listed the devices once
+    assert probe_count(stats) == 3
+    assert probe_count(stats, "-list_devices") == 8
+
+
+def test_devices_stay_consistent_during_a_poll(fake_ffmpeg, tmp_path, monkeypatch):
+    plugged = tmp_path / "plugged.txt"
+    monkeypatch.setenv("FAKEFFMPEG_PLUGGED", str(plugged))
+    _plug(plugged, C920, "Logi Capture")
+    watcher = DeviceWatcher(fake_ffmpeg, backend="dshow")
+    watcher.poll()
+    before = watcher.devices
+    # swap one camera for another, the probe of the new one takes a while
+    _plug(plugged, C920, OBS)
+    monkeypatch.setenv("FAKEFFMPEG_LATENCY", "0.3")
+    poller = threading.Thread(target=watcher.poll)
+    poller.start()
+    snapshots = []
+    while poller.is_alive():
+        snapshots.append(watcher.devices)
+        time.sleep(0.01)
+    poller.join()
+    after = watcher.devices
+    assert len(snapshots) > 10
+    assert all(snapshot in (before, after) for snapshot in snapshots)
+    assert [d["name"] for d in after["video"].values()] == [C920, OBS]